@@ -0,0 +1,84 @@
+"""
+Micro-benchmark: reescrita do DOM bloco a bloco (reparse com BeautifulSoup por bloco)
+versus a representação compacta em slots com uma única passada de montagem por capítulo.
+
+O "modelo" é uma função local que apenas coloca o texto em maiúsculas, então o tempo medido
+é só o overhead do lado Python. Uso:
+
+    python benchmarks/block_rewrite.py [--paragraphs 500] [--repeat 5]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup, Tag
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+
+def fake_translate(html_fragment: str) -> str:
+    return re.sub(r">([^<]+)<", lambda m: ">" + m.group(1).upper() + "<", html_fragment)
+
+
+def build_chapter(paragraphs: int) -> str:
+    body = "<h1>Chapter</h1>" + "".join(
+        f"<p>Paragraph {i} with <em>inline</em> markup and a <a href='#n{i}'>note</a> in ordinary prose.</p>"
+        for i in range(paragraphs)
+    )
+    return f"<html><head><title>c</title></head><body><div>{body}</div></body></html>"
+
+
+def legacy_rewrite(chapter_html: str) -> str:
+    """Abordagem anterior: str() do bloco, BeautifulSoup da tradução e replace_with, bloco a bloco."""
+    soup = BeautifulSoup(chapter_html, 'html.parser')
+    elements = []
+    for selector in main.BLOCK_SELECTORS:
+        elements.extend(soup.find_all(selector))
+    for element_tag in elements:
+        if not element_tag.parent:
+            continue
+        translated = fake_translate(str(element_tag))
+        fragment = BeautifulSoup(translated, 'html.parser')
+        if fragment.contents and isinstance(fragment.contents[0], Tag):
+            element_tag.replace_with(fragment.contents[0])
+    return str(soup)
+
+
+def slot_rewrite(chapter_html: str, validate: bool) -> str:
+    """Abordagem atual: extração única em slots, checagem barata por bloco e montagem numa passada."""
+    soup = BeautifulSoup(chapter_html, 'html.parser')
+    chapter_slots = main.extract_chapter_blocks(soup, "benchmark")
+    for i, block in enumerate(chapter_slots["blocks"]):
+        translated = fake_translate(block["html"])
+        if main.is_balanced_block(translated, block["tag"]):
+            chapter_slots["translated"][i] = translated
+    return main.render_chapter_html(chapter_slots, validate=validate)
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    chapter_html = build_chapter(args.paragraphs)
+    legacy = best_of(lambda: legacy_rewrite(chapter_html), args.repeat)
+    slots = best_of(lambda: slot_rewrite(chapter_html, validate=False), args.repeat)
+    slots_validated = best_of(lambda: slot_rewrite(chapter_html, validate=True), args.repeat)
+
+    print(f"{args.paragraphs} paragraphs, best of {args.repeat}:")
+    print(f"  legacy per-block reparse : {legacy * 1000:8.1f} ms")
+    print(f"  slots + single splice    : {slots * 1000:8.1f} ms ({legacy / slots:.1f}x)")
+    print(f"  slots + validation pass  : {slots_validated * 1000:8.1f} ms ({legacy / slots_validated:.1f}x)")
@@ -0,0 +1,69 @@
+"""
+Verifica o orçamento de tempo de importação de `main` usando `python -X importtime`.
+
+Importar `main` (ex.: para usar translate_chunk num script ou worker) não deve carregar gradio,
+openai, bs4, ebooklib, langdetect nem python-magic. Sai com código 1 se o orçamento for estourado
+ou se alguma dessas dependências for importada. Uso:
+
+    python benchmarks/import_time.py [--budget-ms 150]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["gradio", "openai", "bs4", "ebooklib", "langdetect", "magic"]
+DEFAULT_BUDGET_MS = 150
+
+
+def measure_import(module_name: str = "main") -> dict:
+    """
+    Retorna {módulo: tempo cumulativo em µs} para os módulos importados por `module_name` (incluindo ele mesmo),
+    num processo limpo. O que o interpretador já carrega na inicialização fica de fora.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)", line)
+        if match:
+            entries.append((match.group(4), int(match.group(2)), len(match.group(3))))
+
+    # A saída lista os filhos antes do pai: a subárvore de `module_name` são as linhas
+    # imediatamente anteriores a ele com indentação maior.
+    root_index = max(i for i, entry in enumerate(entries) if entry[0] == module_name)
+    root_depth = entries[root_index][2]
+    cumulative_us = {module_name: entries[root_index][1]}
+    for name, micros, depth in reversed(entries[:root_index]):
+        if depth <= root_depth:
+            break
+        cumulative_us[name] = micros
+    return cumulative_us
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    timings = measure_import()
+    main_ms = timings.get("main", 0) / 1000
+    heavy_loaded = [name for name in HEAVY_MODULES if name in timings]
+    slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[1:6]
+
+    print(f"import main: {main_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for name, micros in slowest:
+        print(f"  {name:<30} {micros / 1000:8.1f} ms")
+
+    failed = False
+    if main_ms > args.budget_ms:
+        print("FAIL: import time budget exceeded.")
+        failed = True
+    if heavy_loaded:
+        print(f"FAIL: heavy dependencies imported eagerly: {', '.join(heavy_loaded)}")
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -1,20 +1,43 @@
-import gradio as gr
-import ebooklib
-from ebooklib import epub
-from bs4 import BeautifulSoup, Tag
-from openai import OpenAI
 import re
 import os
 import tempfile
-from langdetect import detect, DetectorFactory
-from typing import List, Tuple, Optional, Dict, Any
-import magic # python-magic
+import time
+import math
+import json
+import socket
+import contextvars
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import importlib
+from typing import List, Tuple, Optional, Dict, Any, Iterator, Union, TYPE_CHECKING
 import traceback # Para logging de erros detalhado
 import locale
 from translations import translations
 
-# Para garantir resultados consistentes da langdetect
-DetectorFactory.seed = 0
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, Tag
+    from openai import OpenAI
+
+class _LazyModule:
+    """Adia a importação de um módulo pesado até o primeiro acesso a um de seus atributos."""
+    def __init__(self, module_name: str):
+        self._module_name = module_name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+        return getattr(self._module, attr)
+
+# Dependências pesadas: importar `main` (ex.: para usar translate_chunk num script) não deve pagar
+# o custo de gradio/openai/bs4 etc. Cada uma só é carregada quando for usada de fato.
+gr = _LazyModule("gradio")
+ebooklib = _LazyModule("ebooklib")
+epub = _LazyModule("ebooklib.epub")
+bs4 = _LazyModule("bs4")
+openai = _LazyModule("openai")
+magic = _LazyModule("magic") # python-magic
 
 # --- Constantes e Configurações ---
 DEFAULT_OLLAMA_BASE_URL = "http://localhost:11434/v1"
@@ -36,6 +59,28 @@ COMMON_LANGUAGES = [
     ("Chinese (Simplified)", "ZH-CN"),
     ("Polish", "PL"),
 ]
+BLOCK_SELECTORS = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'div', 'caption', 'td', 'th', 'dt', 'dd']
+MIXED_CONTAINER_MAX_CHARS = 500 # Contêineres que misturam texto solto e blocos filhos só viram um bloco único até este tamanho de texto
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+# Marcadores de slot no esqueleto do capítulo (caracteres de uso privado, que não aparecem em texto real)
+SLOT_MARKER_OPEN = "\ue000"
+SLOT_MARKER_CLOSE = "\ue001"
+VALIDATE_SPLICED_CHAPTERS = False # Reparseia cada capítulo montado para conferir o resultado (mais lento; útil para depuração)
+PREVIEW_SAMPLE_BLOCKS = 3 # Blocos traduzidos por capítulo no modo de pré-visualização por amostra
+MAX_CONCURRENCY = 8 # Requisições simultâneas ao Ollama (o servidor precisa de OLLAMA_NUM_PARALLEL >= este valor)
+THROUGHPUT_WINDOW_SECONDS = 120 # Janela da média móvel de vazão (blocos/min, tokens/s) usada no progresso e no ETA
+MODEL_KEEP_ALIVE_MINUTES = 30 # Tempo que o Ollama mantém o modelo carregado depois do último uso (keep_alive)
+MODEL_WARMUP_TIMEOUT_SECONDS = 300 # Limite para carregar o modelo na memória na primeira requisição
+CASCADE_LENGTH_RATIO_RANGE = (0.5, 2.0) # Faixa aceita para o tamanho do texto traduzido pelo modelo rápido em relação ao original
+CASCADE_MIN_CHECK_CHARS = 20 # Abaixo disso (texto do bloco), as checagens de tamanho e de texto inalterado não são confiáveis
+CASCADE_LANGDETECT_MIN_CHARS = 60 # A langdetect só é consultada para traduções com pelo menos este tamanho
+CALIBRATION_CONCURRENCY_LEVELS = [1, 2, 4]
+CALIBRATION_SAMPLE_BLOCKS = 12 # Blocos reais do livro usados em cada configuração da calibração
+CALIBRATION_MAX_FAILURE_RATE = 0.1 # Piso de qualidade: fração máxima de respostas com HTML estruturalmente inválido
+CALIBRATION_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "traduzir_livros", "calibration.json")
+THROUGHPUT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".cache", "traduzir_livros", "throughput.json")
+CHARS_PER_TOKEN_ESTIMATE = 4 # Aproximação de caracteres por token, usada quando o servidor não informa `usage` e na estimativa prévia
+COMPLETION_LENGTH_RATIO = 1.1 # Tamanho esperado da tradução em relação ao original (traduções costumam ser um pouco mais longas)
 
 # --- Lógica Principal de Tradução (Sem alterações) ---
 
@@ -52,6 +97,14 @@ def get_initial_lang():
         pass
     return 'en'
 initial_lang = get_initial_lang()
+t = translations[initial_lang]
+
+def detect_language(text: str) -> str:
+    """Detecta o idioma do texto. A langdetect (e seus perfis de idioma) só é carregada na primeira chamada."""
+    from langdetect import detect, DetectorFactory
+    # Para garantir resultados consistentes da langdetect
+    DetectorFactory.seed = 0
+    return detect(text)
 
 def system_prompt(from_lang: str, to_lang: str) -> str:
     return (
@@ -69,58 +122,441 @@ def system_prompt(from_lang: str, to_lang: str) -> str:
         f"Return ONLY the fully translated HTML content. Do NOT include any additional commentary or markdown outside the HTML. /no_think"
     )
 
-def translate_chunk(client: OpenAI, html_fragment: str, model_name: str, from_lang: str, to_lang: str) -> str:
-    """Traduz um fragmento HTML."""
+class TranslationCancelled(Exception):
+    """Levantada quando um job de tradução é cancelado (botão Parar ou cliente desconectado)."""
+
+class TranslationJobControl:
+    """Token de cancelamento e pausa de um job, consultado entre blocos e durante as requisições em andamento."""
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+        self._paused_since: Optional[float] = None
+        self._paused_total = 0.0
+        self._pause_lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self.resume() # Acorda quem estiver esperando numa pausa, para que veja o cancelamento
+
+    def pause(self):
+        with self._pause_lock:
+            if not self.cancelled and not self.paused:
+                self._running.clear()
+                self._paused_since = time.monotonic()
+
+    def resume(self):
+        with self._pause_lock:
+            if self._paused_since is not None:
+                self._paused_total += time.monotonic() - self._paused_since
+                self._paused_since = None
+            self._running.set()
+
+    def paused_seconds(self, until: Optional[float] = None) -> float:
+        """Tempo total em pausa até o instante `until` (time.monotonic(); padrão: agora), incluindo a pausa atual."""
+        until = time.monotonic() if until is None else until
+        with self._pause_lock:
+            current_pause = until - self._paused_since if self._paused_since is not None and self._paused_since < until else 0.0
+            return self._paused_total + current_pause
+
+    def checkpoint(self):
+        """Bloqueia enquanto o job estiver pausado e levanta TranslationCancelled se ele tiver sido cancelado."""
+        self._running.wait()
+        if self.cancelled:
+            raise TranslationCancelled()
+
+# Jobs em andamento, por sessão do Gradio (session_hash), para os botões de pausa/parada e o evento de desconexão.
+_active_jobs: Dict[str, TranslationJobControl] = {}
+_active_jobs_lock = threading.Lock()
+
+def register_translation_job(session_id: str) -> TranslationJobControl:
+    job_control = TranslationJobControl()
+    with _active_jobs_lock:
+        previous_job = _active_jobs.get(session_id)
+        _active_jobs[session_id] = job_control
+    if previous_job is not None:
+        previous_job.cancel()
+    return job_control
+
+def unregister_translation_job(session_id: str, job_control: TranslationJobControl):
+    with _active_jobs_lock:
+        if _active_jobs.get(session_id) is job_control:
+            del _active_jobs[session_id]
+
+def cancel_translation_job(session_id: str) -> bool:
+    """Cancela o job da sessão, se houver. Retorna se havia um job para cancelar."""
+    with _active_jobs_lock:
+        job_control = _active_jobs.get(session_id)
+    if job_control is None:
+        return False
+    job_control.cancel()
+    return True
+
+def toggle_pause_translation_job(session_id: str) -> Optional[bool]:
+    """Pausa ou retoma o job da sessão. Retorna o novo estado (True = pausado) ou None se não houver job."""
+    with _active_jobs_lock:
+        job_control = _active_jobs.get(session_id)
+    if job_control is None:
+        return None
+    if job_control.paused:
+        job_control.resume()
+    else:
+        job_control.pause()
+    return job_control.paused
+
+# --- Sessões com o Backend ---
+
+class BackendSession:
+    """
+    Conexão reutilizável com um servidor Ollama, compartilhada por todos os jobs do processo: um único cliente
+    OpenAI (e o pool de conexões HTTP dele) e o registro dos modelos que já estão carregados na memória do servidor.
+    """
+    def __init__(self, base_url: str, api_key: str):
+        self.base_url = base_url
+        self.client = openai.OpenAI(base_url=base_url, api_key=api_key)
+        self._lock = threading.Lock()
+        self._model_locks: Dict[str, threading.Lock] = {}
+        self._warm_until: Dict[str, float] = {}
+
+    @property
+    def native_api_url(self) -> Optional[str]:
+        """URL da API nativa do Ollama (sem o sufixo /v1 da API compatível com OpenAI), ou None se não for o caso."""
+        base_url = self.base_url.rstrip("/")
+        return base_url[:-len("/v1")] if base_url.endswith("/v1") else None
+
+    def check_connection(self):
+        """
+        Sonda barata, feita no início de cada job pelo pool já aberto: confirma que o servidor responde e, no Ollama,
+        esquece os modelos que ele não tem mais carregados (reinício, descarregamento por falta de memória).
+        Se o servidor não responder, nenhum modelo é mais considerado aquecido e a exceção do cliente é propagada.
+        """
+        try:
+            self.client.models.list()
+        except Exception:
+            self._warm_until.clear()
+            raise
+        loaded_models = self._loaded_models()
+        if loaded_models is not None:
+            for model_name in list(self._warm_until):
+                if model_name not in loaded_models:
+                    self._warm_until.pop(model_name, None)
+
+    def _loaded_models(self) -> Optional[set]:
+        """Modelos carregados segundo /api/ps do Ollama (com e sem o sufixo ":latest"), ou None se a API nativa não responder."""
+        if not self.native_api_url:
+            return None
+        import urllib.request
+        try:
+            with urllib.request.urlopen(f"{self.native_api_url}/api/ps", timeout=10) as response:
+                running_models = json.loads(response.read().decode("utf-8")).get("models") or []
+        except Exception:
+            return None
+        loaded_models = set()
+        for running_model in running_models:
+            name = running_model.get("name") or running_model.get("model") or ""
+            loaded_models.update({name, name.removesuffix(":latest")})
+        return loaded_models
+
+    def is_model_warm(self, model_name: str) -> bool:
+        return time.monotonic() < self._warm_until.get(model_name, 0.0)
+
+    def _model_lock(self, model_name: str) -> threading.Lock:
+        with self._lock:
+            return self._model_locks.setdefault(model_name, threading.Lock())
+
+    def _mark_warm(self, model_name: str):
+        self._warm_until[model_name] = time.monotonic() + MODEL_KEEP_ALIVE_MINUTES * 60
+
+    def _native_generate(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        import urllib.request
+        request = urllib.request.Request(
+            f"{self.native_api_url}/api/generate",
+            data=json.dumps({**payload, "stream": False, "keep_alive": f"{MODEL_KEEP_ALIVE_MINUTES}m"}).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    def warm_up(self, model_name: str, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Carrega o modelo no servidor com uma requisição mínima, pedindo que ele fique residente por MODEL_KEEP_ALIVE_MINUTES.
+        Retorna os tempos medidos ({"model", "load_s", "warmup_s", "total_s"}) ou None se o modelo já estava aquecido.
+        Chamadas simultâneas para o mesmo modelo esperam o aquecimento em andamento em vez de repeti-lo.
+        """
+        with self._model_lock(model_name):
+            if not force and self.is_model_warm(model_name):
+                return None
+            start = time.perf_counter()
+            load_s = None
+            if self.native_api_url:
+                try:
+                    response = self._native_generate(
+                        {"model": model_name, "prompt": "Hi", "options": {"num_predict": 1}},
+                        MODEL_WARMUP_TIMEOUT_SECONDS
+                    )
+                    load_s = response.get("load_duration", 0) / 1e9
+                except Exception as e:
+                    # Servidor compatível com OpenAI que não é Ollama: aquece pela API de chat.
+                    print(f"BACKEND_SESSION: API nativa do Ollama indisponível em {self.native_api_url} ({type(e).__name__}: {e}). Aquecendo pela API de chat.")
+                    load_s = None
+            if load_s is None:
+                self.client.chat.completions.create(
+                    model=model_name,
+                    messages=[{'role': 'user', 'content': 'Hi'}],
+                    max_tokens=1,
+                    timeout=MODEL_WARMUP_TIMEOUT_SECONDS
+                )
+            total_s = time.perf_counter() - start
+            self._mark_warm(model_name)
+            stats = {
+                "model": model_name,
+                "load_s": round(load_s, 2) if load_s is not None else None,
+                "warmup_s": round(total_s - load_s, 2) if load_s is not None else None,
+                "total_s": round(total_s, 2),
+            }
+            print(f"BACKEND_SESSION: {format_warmup_report(stats)}")
+            return stats
+
+    def keep_alive(self, model_name: str):
+        """
+        Renova o keep_alive do modelo ao fim de um job. As requisições pela API /v1 não levam keep_alive
+        e deixariam o modelo descarregar no prazo padrão do servidor (5 minutos).
+        """
+        if not self.native_api_url:
+            return
+        try:
+            self._native_generate({"model": model_name}, 30)
+            self._mark_warm(model_name)
+        except Exception as e:
+            print(f"BACKEND_SESSION: Não foi possível renovar o keep_alive de {model_name}. Erro: {type(e).__name__} - {e}")
+
+def format_warmup_report(stats: Dict[str, Any]) -> str:
+    if stats["load_s"] is None:
+        return f"Model {stats['model']} ready in {stats['total_s']:.1f}s (load and warm-up)."
+    return f"Model {stats['model']} ready in {stats['total_s']:.1f}s (load {stats['load_s']:.1f}s, warm-up {stats['warmup_s']:.1f}s). Kept loaded for {MODEL_KEEP_ALIVE_MINUTES} min."
+
+_backend_sessions: Dict[str, BackendSession] = {}
+_backend_sessions_lock = threading.Lock()
+
+def get_backend_session(base_url: Optional[str] = None) -> BackendSession:
+    """Retorna a sessão do processo para o servidor em `base_url` (padrão: DEFAULT_OLLAMA_BASE_URL), criando-a no primeiro uso."""
+    base_url = base_url or DEFAULT_OLLAMA_BASE_URL
+    with _backend_sessions_lock:
+        session = _backend_sessions.get(base_url)
+        if session is None:
+            session = _backend_sessions[base_url] = BackendSession(base_url, DEFAULT_OLLAMA_API_KEY)
+        return session
+
+def request_translation(client: "OpenAI", html_fragment: str, model_name: str, from_lang: str, to_lang: str, job_control: Optional[TranslationJobControl] = None) -> Tuple[str, int]:
+    """
+    Envia um fragmento HTML ao modelo e retorna (tradução já limpa, tokens gerados). Erros são propagados para quem chamou.
+    Com `job_control`, a resposta é recebida em streaming para que um cancelamento interrompa também a requisição em andamento.
+    """
+    request_kwargs = dict(
+        model=model_name,
+        temperature=0.2,
+        messages=[
+            {'role': 'system', 'content': system_prompt(from_lang, to_lang)},
+            {'role': 'user', 'content': html_fragment},
+        ],
+        timeout=180
+    )
+    if job_control is None:
+        response = client.chat.completions.create(**request_kwargs)
+        translated_text = response.choices[0].message.content
+        usage = getattr(response, "usage", None)
+    else:
+        stream = client.chat.completions.create(stream=True, extra_body={"stream_options": {"include_usage": True}}, **request_kwargs)
+        text_pieces, usage = [], None
+        try:
+            for chunk in stream:
+                if job_control.cancelled:
+                    # Fechar a conexão faz o Ollama abandonar a geração em vez de ocupar a GPU até o fim.
+                    raise TranslationCancelled()
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text_pieces.append(chunk.choices[0].delta.content)
+                usage = getattr(chunk, "usage", None) or usage
+        finally:
+            stream.response.close()
+        translated_text = "".join(text_pieces)
+
+    translated_text = re.sub(r'<think>.*?</think>', '', translated_text, flags=re.DOTALL).strip()
+    translated_text = translated_text.replace('<think>', '').replace('</think>', '')
+    # Sem `usage` na resposta, estima pelo número de caracteres.
+    completion_tokens = usage.completion_tokens if usage and usage.completion_tokens else len(translated_text) // CHARS_PER_TOKEN_ESTIMATE
+    return translated_text, completion_tokens
+
+def translate_chunk(client: "OpenAI", html_fragment: str, model_name: str, from_lang: str, to_lang: str, progress_tracker=None, job_control: Optional[TranslationJobControl] = None, keep_original_on_error: bool = True) -> Optional[str]:
+    """
+    Traduz um fragmento HTML. Se houver `progress_tracker`, informa a ele os tokens gerados.
+    Com `job_control`, espera enquanto o job estiver pausado e propaga TranslationCancelled.
+    Em caso de erro devolve o fragmento original, ou None se `keep_original_on_error` for False.
+    """
     if not html_fragment.strip():
         return html_fragment
+    if job_control is not None:
+        job_control.checkpoint()
     try:
         print(f"TRANSLATE_CHUNK: Enviando para o modelo {model_name}. De: {from_lang}, Para: {to_lang}. Tamanho do fragmento: {len(html_fragment)} chars.")
         print(f"TRANSLATE_CHUNK: Conteúdo do fragmento (primeiros 300 chars):\n{html_fragment[:300]}")
-        response = client.chat.completions.create(
-            model=model_name,
-            temperature=0.2,
-            messages=[
-                {'role': 'system', 'content': system_prompt(from_lang, to_lang)},
-                {'role': 'user', 'content': html_fragment},
-            ],
-            timeout=180
-        )
-        translated_text = response.choices[0].message.content
-        translated_text = re.sub(r'<think>.*?</think>', '', translated_text, flags=re.DOTALL).strip()
+        translated_text, completion_tokens = request_translation(client, html_fragment, model_name, from_lang, to_lang, job_control)
+        if progress_tracker is not None:
+            progress_tracker.record_tokens(completion_tokens)
         print(f"TRANSLATE_CHUNK: Recebido do modelo {model_name}. Tamanho da tradução: {len(translated_text)} chars.")
         print(f"TRANSLATE_CHUNK: Conteúdo traduzido (primeiros 300 chars):\n{translated_text[:300]}")
-        translated_text = translated_text.replace('<think>', '').replace('</think>', '')
         print(f"TRANSLATE_CHUNK: Fragmento traduzido final (após limpeza):\n{translated_text}")
         return translated_text
+    except TranslationCancelled:
+        raise
     except Exception as e:
         print(f"TRANSLATE_CHUNK: ERRO ao traduzir fragmento com modelo {model_name}. Erro: {e}")
         traceback.print_exc()
+        if not keep_original_on_error:
+            return None
         gr.Warning(f"Error translating an HTML fragment with model {model_name}: {type(e).__name__}. Original fragment will be used.")
         return html_fragment
 
-def translate_html_block_elements(
-    client: OpenAI,
-    soup: BeautifulSoup,
+def translate_fragments(
+    client: "OpenAI",
+    html_fragments: List[str],
     model_name: str,
     from_lang: str,
-    to_lang: str,
-    chapter_name: str,
-    progress_callback_chapter_blocks=None
-):
-    """Itera sobre elementos de bloco no BeautifulSoup object, traduz seu conteúdo HTML e substitui o elemento original pelo traduzido."""
-    block_selectors = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'div', 'caption', 'td', 'th', 'dt', 'dd']
-    elements_to_translate = []
-    for selector in block_selectors:
-        elements_to_translate.extend(soup.find_all(selector))
+    to_lang: Union[str, List[str]],
+    concurrency: int = 1,
+    progress_tracker=None,
+    job_control: Optional[TranslationJobControl] = None,
+    keep_original_on_error: bool = True
+) -> Iterator[Tuple[int, Optional[str]]]:
+    """
+    Traduz vários fragmentos, produzindo (posição, tradução) à medida que cada um fica pronto. Com concurrency > 1 as requisições são enviadas em paralelo.
+    `to_lang` pode ser um idioma para todos os fragmentos ou uma lista com o idioma de destino de cada um.
+    """
+    target_langs = to_lang if isinstance(to_lang, list) else [to_lang] * len(html_fragments)
+    if concurrency <= 1 or len(html_fragments) <= 1:
+        for pos, fragment in enumerate(html_fragments):
+            yield pos, translate_chunk(client, fragment, model_name, from_lang, target_langs[pos], progress_tracker, job_control, keep_original_on_error)
+        return
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        # Cada tarefa roda numa cópia do contexto para que gr.Warning continue chegando à sessão certa.
+        futures = {
+            executor.submit(contextvars.copy_context().run, translate_chunk, client, fragment, model_name, from_lang, target_langs[pos], progress_tracker, job_control, keep_original_on_error): pos
+            for pos, fragment in enumerate(html_fragments)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # Num cancelamento, descarta os blocos que ainda não começaram; os em andamento abortam no próximo chunk.
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def is_single_element_html(html_str: str) -> bool:
+    """Verifica se o HTML reparseia para exatamente um elemento (ignorando espaços em branco ao redor)."""
+    fragment = bs4.BeautifulSoup(html_str, 'html.parser')
+    top_level_nodes = [node for node in fragment.contents if isinstance(node, bs4.Tag) or node.strip()]
+    return len(top_level_nodes) == 1 and isinstance(top_level_nodes[0], bs4.Tag)
+
+def _has_loose_text(node: "Tag", block_names: set) -> bool:
+    """Verifica se o elemento tem texto visível fora dos blocos filhos: texto direto ou dentro de tags inline (comentários não contam)."""
+    for child in node.children:
+        if isinstance(child, bs4.Tag):
+            if child.name not in block_names and _has_loose_text(child, block_names):
+                return True
+        elif not isinstance(child, bs4.element.PreformattedString) and child.strip():
+            return True
+    return False
+
+def _wrap_loose_runs(soup: "BeautifulSoup", node: "Tag", block_names: set) -> List["Tag"]:
+    """
+    Envolve cada sequência de texto solto e tags inline entre os blocos filhos de `node` num <span data-text-node>,
+    retornando os spans. Espaços em branco e comentários nas pontas de cada sequência ficam de fora, no esqueleto.
+    """
+    runs, run = [], []
+    for child in list(node.children):
+        if isinstance(child, bs4.Tag) and (child.name in block_names or child.find(BLOCK_SELECTORS)):
+            runs.append(run)
+            run = []
+        else:
+            run.append(child)
+    runs.append(run)
+
+    def has_visible_text(child) -> bool:
+        if isinstance(child, bs4.Tag):
+            return _has_loose_text(child, block_names)
+        return not isinstance(child, bs4.element.PreformattedString) and bool(child.strip())
+
+    wrapper_spans = []
+    for run in runs:
+        while run and not isinstance(run[0], bs4.Tag) and not has_visible_text(run[0]):
+            run.pop(0)
+        while run and not isinstance(run[-1], bs4.Tag) and not has_visible_text(run[-1]):
+            run.pop()
+        if not any(has_visible_text(child) for child in run):
+            continue
+        wrapper_span = soup.new_tag("span", attrs={"data-text-node": "true"})
+        run[0].insert_before(wrapper_span)
+        for child in run:
+            wrapper_span.append(child.extract())
+        wrapper_spans.append(wrapper_span)
+    return wrapper_spans
+
+def select_block_elements(soup: "BeautifulSoup") -> List["Tag"]:
+    """
+    Seleciona, em ordem de documento, blocos que não se sobrepõem: o bloco mais interno de cada ramo.
+    Um contêiner que mistura texto solto com blocos filhos (ex.: <td><b>Rótulo:</b><p>...</p></td>) vira um bloco
+    único se for pequeno; se passar de MIXED_CONTAINER_MAX_CHARS, cada trecho de texto solto é envolvido num
+    <span data-text-node> próprio e os blocos filhos continuam separados (ex.: números de página entre parágrafos).
+    """
+    block_names = set(BLOCK_SELECTORS)
+    selected = []
+    loose_wrappers = set()
+    stack = [iter(soup.children)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            continue
+        if not isinstance(node, bs4.Tag):
+            continue
+        if id(node) in loose_wrappers:
+            selected.append(node)
+            continue
+        if node.name in block_names:
+            if not node.find(BLOCK_SELECTORS):
+                selected.append(node)
+                continue
+            if _has_loose_text(node, block_names):
+                if len(node.get_text()) <= MIXED_CONTAINER_MAX_CHARS:
+                    selected.append(node)
+                    continue
+                loose_wrappers.update(id(wrapper_span) for wrapper_span in _wrap_loose_runs(soup, node, block_names))
+        stack.append(iter(node.children))
+    return selected
+
+def wrap_loose_body_text(soup: "BeautifulSoup") -> List["Tag"]:
+    """Envolve cada nó de texto solto direto do <body> num <span data-text-node>, retornando os spans (um bloco cada)."""
+    all_text_nodes_in_body = soup.body.find_all(string=True, recursive=False) if soup.body else []
+    wrapper_spans = []
+    for text_node in all_text_nodes_in_body:
+        if text_node.strip():
+            wrapper_span = soup.new_tag("span", attrs={"data-text-node": "true"})
+            text_node.wrap(wrapper_span)
+            wrapper_spans.append(wrapper_span)
+    return wrapper_spans
+
+def collect_block_elements(soup: "BeautifulSoup", chapter_name: str) -> List["Tag"]:
+    """Coleta os elementos de bloco do capítulo. Se não houver nenhum, envolve os nós de texto soltos do <body> em <span>."""
+    elements_to_translate = select_block_elements(soup)
 
     if not elements_to_translate:
-        all_text_nodes_in_body = soup.body.find_all(string=True, recursive=False) if soup.body else []
-        temp_elements = []
-        for text_node in all_text_nodes_in_body:
-            if text_node.strip():
-                wrapper_span = soup.new_tag("span", attrs={"data-text-node": "true"})
-                text_node.wrap(wrapper_span)
-                temp_elements.append(wrapper_span)
+        temp_elements = wrap_loose_body_text(soup)
         if temp_elements:
             gr.Info(f"No common block elements found in '{chapter_name}'. Processing loose text nodes directly within <body>.")
             print(f"TRANSLATE_HTML_BLOCKS: Nenhum elemento de bloco comum encontrado em '{chapter_name}'. Processando nós de texto soltos.")
@@ -128,62 +564,298 @@ def translate_html_block_elements(
         else:
             gr.Warning(f"No translatable block elements or direct text content found in chapter '{chapter_name}'. Skipping.")
             print(f"TRANSLATE_HTML_BLOCKS: Nenhum bloco traduzível ou conteúdo de texto direto encontrado no capítulo '{chapter_name}'. Pulando.")
-            return
 
-    num_blocks = len(elements_to_translate)
+    return elements_to_translate
+
+def extract_chapter_blocks(soup: "BeautifulSoup", chapter_name: str) -> Dict[str, Any]:
+    """
+    Converte o capítulo numa representação compacta: cada bloco vira um slot com seu HTML original e o restante
+    do documento é serializado uma única vez como esqueleto, com marcadores no lugar dos blocos.
+    O DOM (`soup`) é consumido no processo e não deve ser reutilizado.
+    """
+    elements = collect_block_elements(soup, chapter_name)
+    blocks = []
+    for slot_index, element_tag in enumerate(elements):
+        blocks.append({"tag": element_tag.name, "html": str(element_tag), "chars": len(element_tag.get_text())})
+        element_tag.replace_with(bs4.NavigableString(f"{SLOT_MARKER_OPEN}{slot_index}{SLOT_MARKER_CLOSE}"))
+
+    # re.split com grupo de captura alterna texto do esqueleto (posições pares) e índices de slot (ímpares).
+    skeleton_parts = re.split(f"{SLOT_MARKER_OPEN}(\\d+){SLOT_MARKER_CLOSE}", str(soup))
+    for k in range(1, len(skeleton_parts), 2):
+        skeleton_parts[k] = int(skeleton_parts[k])
+    return {"skeleton_parts": skeleton_parts, "blocks": blocks, "translated": [None] * len(blocks)}
+
+def slots_for_target_language(chapter_slots: Dict[str, Any]) -> Dict[str, Any]:
+    """Slots de mais um idioma de destino: compartilham esqueleto e blocos originais, com traduções próprias."""
+    return {**chapter_slots, "translated": [None] * len(chapter_slots["blocks"])}
+
+def render_chapter_html(chapter_slots: Dict[str, Any], validate: bool = VALIDATE_SPLICED_CHAPTERS) -> str:
+    """Monta o HTML do capítulo numa única passada, usando a tradução de cada slot quando existir e o original caso contrário."""
+    blocks, translated = chapter_slots["blocks"], chapter_slots["translated"]
+    html_parts = []
+    for k, part in enumerate(chapter_slots["skeleton_parts"]):
+        if k % 2 == 0:
+            html_parts.append(part)
+        else:
+            html_parts.append(translated[part] if translated[part] is not None else blocks[part]["html"])
+    chapter_html = "".join(html_parts)
+    if validate:
+        validate_chapter_html(chapter_html)
+    return chapter_html
+
+def validate_chapter_html(chapter_html: str) -> bool:
+    """Validação opcional do capítulo montado: nenhum marcador de slot remanescente e todas as tags balanceadas."""
+    problems = []
+    if SLOT_MARKER_OPEN in chapter_html or SLOT_MARKER_CLOSE in chapter_html:
+        problems.append("leftover slot markers")
+    if not tags_are_balanced(chapter_html):
+        problems.append("unbalanced tags")
+    if problems:
+        print(f"VALIDATE_CHAPTER_HTML: Problemas no capítulo montado: {'; '.join(problems)}")
+        gr.Warning(f"Spliced chapter failed validation: {'; '.join(problems)}.")
+        return False
+    return True
+
+_TAG_PATTERN = re.compile(r'<(/?)([a-zA-Z][\w:.-]*)(?:\s[^<>]*?)?(/?)>')
+
+def tags_are_balanced(html_str: str, single_root: bool = False) -> bool:
+    """
+    Checagem barata (regex, sem parser) de que as tags abrem e fecham na ordem certa.
+    Com `single_root`, exige também que nada venha depois do fechamento do primeiro elemento.
+    """
+    open_tags = []
+    for tag_match in _TAG_PATTERN.finditer(html_str):
+        is_closing, name, is_self_closing = tag_match.group(1), tag_match.group(2).lower(), tag_match.group(3)
+        if name in VOID_ELEMENTS or is_self_closing:
+            continue
+        if not is_closing:
+            open_tags.append(name)
+            continue
+        if not open_tags or open_tags[-1] != name:
+            return False
+        open_tags.pop()
+        if single_root and not open_tags and tag_match.end() != len(html_str):
+            return False
+    return not open_tags
+
+def is_balanced_block(html_str: str, expected_tag: str) -> bool:
+    """Verifica, sem reparsear, se a tradução é um único elemento `expected_tag` bem formado. Se não for, ela passa por `coerce_translated_block`."""
+    html_str = html_str.strip()
+    first_tag = _TAG_PATTERN.match(html_str)
+    if not first_tag or first_tag.group(1) or first_tag.group(2).lower() != expected_tag:
+        return False
+    return tags_are_balanced(html_str, single_root=True)
+
+def coerce_translated_block(original_html: str, translated_html_str: str, chapter_name: str) -> str:
+    """Caminho lento para traduções que não passam em `is_balanced_block`: reparseia e extrai um único elemento, ou insere só o texto no bloco original."""
+    translated_soup_fragment = bs4.BeautifulSoup(translated_html_str, 'html.parser')
+    new_element = None
+    if translated_soup_fragment.body and translated_soup_fragment.body.contents:
+        if len(translated_soup_fragment.body.contents) == 1 and isinstance(translated_soup_fragment.body.contents[0], bs4.Tag):
+            new_element = translated_soup_fragment.body.contents[0]
+        else:
+            new_element = translated_soup_fragment.body.find(lambda tag: isinstance(tag, bs4.Tag), recursive=False)
+            if not new_element:
+                temp_span = translated_soup_fragment.new_tag("span", attrs={"data-translated-wrapper": "true"})
+                for content_item in list(translated_soup_fragment.body.contents):
+                    temp_span.append(content_item.extract())
+                new_element = temp_span
+    elif translated_soup_fragment.contents and isinstance(translated_soup_fragment.contents[0], bs4.Tag):
+        new_element = translated_soup_fragment.contents[0]
+
+    if new_element:
+        return str(new_element)
+
+    original_element = bs4.BeautifulSoup(original_html, 'html.parser').find(True)
+    if not (original_element.name == "span" and original_element.get("data-text-node") == "true"):
+        gr.Warning(f"Translated content for a block in '{chapter_name}' was not a single valid HTML element. Inserting as text if possible or keeping original.")
+    original_element.string = translated_soup_fragment.get_text()
+    return str(original_element)
+
+def _block_text(html_str: str) -> str:
+    return re.sub(r"\s+", " ", _TAG_PATTERN.sub(" ", html_str)).strip()
+
+def tag_signature(html_str: str) -> collections.Counter:
+    """Quantas vezes cada tag abre no fragmento. A ordem fica de fora: ela pode mudar legitimamente na tradução."""
+    return collections.Counter(tag_match.group(2).lower() for tag_match in _TAG_PATTERN.finditer(html_str) if not tag_match.group(1))
+
+def cascade_check_failure(original_html: str, translated_html_str: Optional[str], expected_tag: str, to_lang: str) -> Optional[str]:
+    """
+    Checagens baratas da resposta do modelo rápido na cascata. Retorna o motivo para reenviar o bloco ao modelo
+    grande ("error", "structure", "tags", "unchanged", "length" ou "language") ou None se a tradução puder ser aceita.
+    `translated_html_str` é None quando a requisição ao modelo rápido falhou.
+    """
+    if translated_html_str is None:
+        return "error"
+    if not translated_html_str or not is_balanced_block(translated_html_str, expected_tag):
+        return "structure"
+    if tag_signature(translated_html_str) != tag_signature(original_html):
+        return "tags"
+    original_text, translated_text = _block_text(original_html), _block_text(translated_html_str)
+    if len(original_text) >= CASCADE_MIN_CHECK_CHARS:
+        if translated_text == original_text:
+            return "unchanged"
+        min_ratio, max_ratio = CASCADE_LENGTH_RATIO_RANGE
+        if not min_ratio <= len(translated_text) / len(original_text) <= max_ratio:
+            return "length"
+    if len(translated_text) >= CASCADE_LANGDETECT_MIN_CHARS:
+        try:
+            detected_lang = detect_language(translated_text)
+        except Exception:
+            return None # Sem detecção não há evidência contra a tradução.
+        if detected_lang.split('-')[0].lower() != to_lang.split('-')[0].lower():
+            return "language"
+    return None
+
+class CascadeStats:
+    """Contagens por nível da cascata de modelos e tempo de parede de cada nível, para o relatório ao fim do job."""
+    def __init__(self, fast_model_name: str, model_name: str, concurrency: int = 1):
+        self.fast_model_name = fast_model_name
+        self.model_name = model_name
+        self.concurrency = concurrency
+        self.fast_accepted = 0
+        self.fast_accepted_chars = 0 # Texto e HTML dos blocos aceitos, para estimar o custo deles no modelo grande
+        self.fast_accepted_html_chars = 0
+        self.escalated = 0
+        self.escalation_reasons = collections.Counter()
+        self.fast_seconds = 0.0
+        self.escalation_seconds = 0.0
+
+    def time_saved_seconds(self) -> Optional[float]:
+        """
+        Estimativa: os blocos aceitos do modelo rápido teriam custado o tempo médio por bloco medido no modelo grande,
+        menos todo o tempo gasto no modelo rápido (inclusive nos blocos que acabaram escalados). Sem escalonamentos
+        neste job, usa a vazão do modelo grande já medida neste host; None se também não houver essa medida.
+        """
+        if self.escalated:
+            return self.fast_accepted * self.escalation_seconds / self.escalated - self.fast_seconds
+        if not self.fast_accepted:
+            return None
+        throughput = find_measured_throughput(self.model_name, int(self.concurrency))
+        if throughput and "chars_per_s" in throughput:
+            main_model_seconds = self.fast_accepted_chars / throughput["chars_per_s"]
+        elif throughput:
+            main_model_seconds = self.fast_accepted_html_chars / CHARS_PER_TOKEN_ESTIMATE * COMPLETION_LENGTH_RATIO / throughput["tokens_per_s"]
+        else:
+            return None
+        return main_model_seconds - self.fast_seconds
+
+    def describe(self) -> str:
+        total = self.fast_accepted + self.escalated
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in self.escalation_reasons.most_common())
+        report = f"Cascade: {self.fast_accepted}/{total} blocks accepted from {self.fast_model_name}, {self.escalated} escalated to {self.model_name}"
+        report += f" ({reasons})." if reasons else "."
+        saved = self.time_saved_seconds()
+        if saved is not None and saved >= 0:
+            report += f" Estimated time saved: {saved / 60:.1f} min."
+        elif saved is not None:
+            report += f" Estimated extra time from the cascade: {-saved / 60:.1f} min (too many escalations for it to pay off)."
+        return report
+
+def report_cascade_stats(cascade_stats: Optional[CascadeStats]) -> None:
+    """Mostra o relatório da cascata no log e na interface, se o job usou um modelo rápido."""
+    if cascade_stats is None:
+        return
+    print(f"REPORT_CASCADE_STATS: {cascade_stats.describe()}")
+    gr.Info(cascade_stats.describe())
+
+def translate_html_block_elements(
+    client: "OpenAI",
+    chapter_targets: Dict[str, Dict[str, Any]],
+    model_name: str,
+    from_lang: str,
+    chapter_name: str,
+    progress_callback_chapter_blocks=None,
+    block_indices: Optional[List[int]] = None,
+    concurrency: int = 1,
+    progress_tracker=None,
+    job_control: Optional[TranslationJobControl] = None,
+    fast_model_name: Optional[str] = None,
+    cascade_stats: Optional[CascadeStats] = None
+):
+    """
+    Traduz os blocos de um capítulo extraído por `extract_chapter_blocks` para cada idioma de `chapter_targets`
+    ({idioma: slots}, ver `slots_for_target_language`), guardando cada tradução no slot do seu idioma.
+    As requisições de todos os idiomas são intercaladas no mesmo pool, bloco a bloco.
+    `block_indices` restringe a tradução a um subconjunto dos slots; com `concurrency` > 1 as requisições são paralelas.
+    `progress_callback_chapter_blocks(fração, block_index, translated)` é chamado a cada bloco concluído em cada idioma;
+    `translated` é False quando a requisição falhou e o bloco ficou com o texto original.
+    Com `fast_model_name`, os blocos passam primeiro por esse modelo e só os que falham em `cascade_check_failure`
+    são reenviados a `model_name`; as contagens vão para `cascade_stats`.
+    """
+    blocks = next(iter(chapter_targets.values()))["blocks"]
+    num_blocks = len(blocks)
     if num_blocks == 0:
         print(f"TRANSLATE_HTML_BLOCKS: Capítulo '{chapter_name}': Encontrados {num_blocks} blocos/elementos HTML para traduzir.")
-        gr.Info(f"Chapter '{chapter_name}' has no content blocks to translate.")
         return
 
-    print(f"Chapter '{chapter_name}': Found {num_blocks} HTML blocks/elements to translate.")
+    indices_to_translate = list(block_indices) if block_indices is not None else list(range(num_blocks))
+    pending_indices = [i for i in indices_to_translate if blocks[i]["html"].strip()]
+    print(f"Chapter '{chapter_name}': Found {num_blocks} HTML blocks/elements, translating {len(pending_indices)} of them into {', '.join(chapter_targets)}.")
+    for i in pending_indices:
+        print(f"TRANSLATE_HTML_BLOCKS: Traduzindo bloco {i+1}/{num_blocks} do capítulo '{chapter_name}' (tag: {blocks[i]['tag']}). Tamanho original: {len(blocks[i]['html'])} chars.")
+
+    tasks = [(i, lang) for i in pending_indices for lang in chapter_targets]
+    blocks_finished = 0
 
-    for i, element_tag in enumerate(elements_to_translate):
+    def block_finished(i: int, translated: bool = True):
+        nonlocal blocks_finished
+        blocks_finished += 1
         if progress_callback_chapter_blocks:
-            progress_callback_chapter_blocks( (i + 1) / num_blocks )
+            progress_callback_chapter_blocks(blocks_finished / len(tasks), i, translated)
 
-        if not element_tag.parent:
-            print(f"TRANSLATE_HTML_BLOCKS: Pulando elemento {element_tag.name} (bloco {i+1}/{num_blocks}) pois não está mais na árvore (provavelmente parte de um pai já traduzido).")
-            continue
+    def translate_tasks(task_list: List[Tuple[int, str]], tier_model_name: str, keep_original_on_error: bool = True) -> Iterator[Tuple[int, str, Optional[str]]]:
+        fragments = [blocks[i]["html"] for i, _ in task_list]
+        for pos, translated_html_str in translate_fragments(client, fragments, tier_model_name, from_lang, [lang for _, lang in task_list], max(1, int(concurrency)), progress_tracker, job_control, keep_original_on_error):
+            yield task_list[pos][0], task_list[pos][1], translated_html_str
+
+    remaining_tasks = tasks
+    if fast_model_name:
+        remaining_tasks = []
+        wave_start = time.perf_counter()
+        for i, lang, translated_html_str in translate_tasks(tasks, fast_model_name, keep_original_on_error=False):
+            failure_reason = cascade_check_failure(blocks[i]["html"], translated_html_str, blocks[i]["tag"], lang)
+            if failure_reason:
+                print(f"TRANSLATE_HTML_BLOCKS: Bloco {i+1}/{num_blocks} ({lang}) reprovado no modelo rápido {fast_model_name} ({failure_reason}). Reenviando para {model_name}.")
+                remaining_tasks.append((i, lang))
+                if cascade_stats is not None:
+                    cascade_stats.escalation_reasons[failure_reason] += 1
+                continue
+            block_finished(i)
+            chapter_targets[lang]["translated"][i] = translated_html_str.strip()
+            if cascade_stats is not None:
+                cascade_stats.fast_accepted_chars += blocks[i]["chars"]
+                cascade_stats.fast_accepted_html_chars += len(blocks[i]["html"])
+        if cascade_stats is not None:
+            cascade_stats.fast_seconds += time.perf_counter() - wave_start
+            cascade_stats.fast_accepted += len(tasks) - len(remaining_tasks)
+            cascade_stats.escalated += len(remaining_tasks)
 
-        original_html_fragment = str(element_tag)
-        if not original_html_fragment.strip():
+    wave_start = time.perf_counter()
+    for i, lang, translated_html_str in translate_tasks(remaining_tasks, model_name, keep_original_on_error=False):
+        block_finished(i, translated=translated_html_str is not None)
+        if translated_html_str is None:
+            gr.Warning(f"Error translating block {i+1} of '{chapter_name}' into {lang} with model {model_name}. Original content kept for this block.")
             continue
 
-        print(f"TRANSLATE_HTML_BLOCKS: Traduzindo bloco {i+1}/{num_blocks} do capítulo '{chapter_name}' (tag: {element_tag.name}, ID do elemento na lista: {i}). Tamanho original: {len(original_html_fragment)} chars.")
-        translated_html_str = translate_chunk(client, original_html_fragment, model_name, from_lang, to_lang)
+        original_html_fragment = blocks[i]["html"]
+        if not translated_html_str or translated_html_str.strip() == original_html_fragment.strip():
+            continue
 
-        if translated_html_str and translated_html_str.strip() != original_html_fragment.strip():
-            print(f"TRANSLATE_HTML_BLOCKS: Bloco {i+1}/{num_blocks} ('{element_tag.name}') traduzido. Tentando substituir no DOM. Tamanho traduzido: {len(translated_html_str)} chars.")
-            try:
-                translated_soup_fragment = BeautifulSoup(translated_html_str, 'html.parser')
-                new_element = None
-                if translated_soup_fragment.body and translated_soup_fragment.body.contents:
-                    if len(translated_soup_fragment.body.contents) == 1 and isinstance(translated_soup_fragment.body.contents[0], Tag):
-                        new_element = translated_soup_fragment.body.contents[0]
-                    else:
-                        new_element = translated_soup_fragment.body.find(lambda tag: isinstance(tag, Tag), recursive=False)
-                        if not new_element:
-                            temp_span = soup.new_tag("span", attrs={"data-translated-wrapper": "true"})
-                            for content_item in translated_soup_fragment.body.contents:
-                                temp_span.append(content_item.extract())
-                            new_element = temp_span
-                elif translated_soup_fragment.contents and isinstance(translated_soup_fragment.contents[0], Tag):
-                    new_element = translated_soup_fragment.contents[0]
-
-                if new_element:
-                    element_tag.replace_with(new_element)
-                else:
-                    if element_tag.name == "span" and element_tag.get("data-text-node") == "true":
-                        element_tag.string = translated_soup_fragment.get_text()
-                    else:
-                        gr.Warning(f"Translated content for a block in '{chapter_name}' was not a single valid HTML element. Inserting as text if possible or keeping original.")
-                        print(f"TRANSLATE_HTML_BLOCKS: Conteúdo traduzido para o bloco {i+1}/{num_blocks} em '{chapter_name}' não era um elemento HTML único válido.")
-                        element_tag.string = translated_soup_fragment.get_text()
-            except Exception as e:
-                print(f"TRANSLATE_HTML_BLOCKS: ERRO ao parsear ou substituir bloco HTML traduzido no capítulo '{chapter_name}'. Bloco {i+1}/{num_blocks} (tag: {element_tag.name}). Erro: {e}")
-                traceback.print_exc()
-                gr.Warning(f"Could not process translated block in '{chapter_name}': {type(e).__name__}. Original content kept for this block.")
+        translated_slots = chapter_targets[lang]["translated"]
+        print(f"TRANSLATE_HTML_BLOCKS: Bloco {i+1}/{num_blocks} ('{blocks[i]['tag']}') traduzido para {lang}. Tamanho traduzido: {len(translated_html_str)} chars.")
+        if is_balanced_block(translated_html_str, blocks[i]["tag"]):
+            translated_slots[i] = translated_html_str.strip()
+            continue
+        try:
+            print(f"TRANSLATE_HTML_BLOCKS: Bloco {i+1}/{num_blocks} em '{chapter_name}' ({lang}) não passou na checagem rápida. Reparseando.")
+            translated_slots[i] = coerce_translated_block(original_html_fragment, translated_html_str, chapter_name)
+        except Exception as e:
+            print(f"TRANSLATE_HTML_BLOCKS: ERRO ao parsear bloco HTML traduzido no capítulo '{chapter_name}'. Bloco {i+1}/{num_blocks} (tag: {blocks[i]['tag']}). Erro: {e}")
+            traceback.print_exc()
+            gr.Warning(f"Could not process translated block in '{chapter_name}': {type(e).__name__}. Original content kept for this block.")
+    if fast_model_name and remaining_tasks and cascade_stats is not None:
+        cascade_stats.escalation_seconds += time.perf_counter() - wave_start
 
 
 # --- Funções Auxiliares Gradio (Com Alterações) ---
@@ -194,15 +866,19 @@ def get_epub_chapters_details(epub_path: str) -> List[Dict[str, Any]]:
         book = epub.read_epub(epub_path)
         chapters = []
         for i, item in enumerate(book.get_items_of_type(ebooklib.ITEM_DOCUMENT)):
-            soup = BeautifulSoup(item.get_content(), 'html.parser')
+            soup = bs4.BeautifulSoup(item.get_content(), 'html.parser')
             text_content = soup.get_text()
             title_tag = soup.find(['h1', 'h2'])
             chapter_display_name = title_tag.get_text(strip=True) if title_tag else item.get_name()
             if not chapter_display_name:  chapter_display_name = f"Chapter Document {i+1}"
+            # Blocos que virariam requisições (mesma seleção e mesmo fallback de collect_block_elements), para a estimativa prévia.
+            block_html = [str(element_tag) for element_tag in select_block_elements(soup) or wrap_loose_body_text(soup)]
             chapters.append({
                 "id": item.get_name(),
                 "name": chapter_display_name,
                 "char_count": len(text_content),
+                "block_count": len(block_html),
+                "block_html_chars": sum(len(html) for html in block_html),
                 "preview": text_content[:200].strip().replace('\n', ' ')
             })
         print(f"GET_EPUB_CHAPTERS_DETAILS: Detalhes de {len(chapters)} capítulos extraídos com sucesso para: {epub_path}")
@@ -222,7 +898,7 @@ def parse_epub_metadata_and_chapters(epub_file_obj: Optional[tempfile._Temporary
         return (
             gr.update(choices=[], value=[], label=t['chapters_selector_label'], interactive=False),
             gr.update(value="auto"),
-            gr.update(value="PT-BR"),
+            gr.update(value=["PT-BR"]),
             gr.update(value=""),
             gr.update(value=""),
             gr.update(value=""),
@@ -264,7 +940,7 @@ def parse_epub_metadata_and_chapters(epub_file_obj: Optional[tempfile._Temporary
     try:
         sample_text = " ".join([ch['preview'] for ch in chapters_details[:5]])
         if sample_text.strip():
-            detected_lang = detect(sample_text.strip()).split('-')[0].upper()
+            detected_lang = detect_language(sample_text.strip()).split('-')[0].upper()
             match = next((code for name, code in COMMON_LANGUAGES if code != "auto" and detected_lang.startswith(code)), None)
             if match:
                 detected_lang_code = match
@@ -296,26 +972,14 @@ def parse_epub_metadata_and_chapters(epub_file_obj: Optional[tempfile._Temporary
         book_data # Popula o book_data_state
     )
 
-def gradio_translate_epub(
-    epub_file_obj: tempfile._TemporaryFileWrapper,
-    model_name: str,
-    from_lang_ui: str,
-    to_lang_ui: str,
-    selected_chapter_indices: List[int],
-    progress=gr.Progress(track_tqdm=True)
-):
-    if not epub_file_obj:
-        gr.Error("Please upload an EPUB file first.")
-        return None
-    if not model_name:
-        gr.Error("Please enter or select an Ollama model name.")
-        return None
-    if not selected_chapter_indices:
-        gr.Warning("No chapters selected for translation. Nothing to do.")
-        return None
-
-    input_epub_path = epub_file_obj.name
+def target_language_list(to_lang_ui: Union[str, List[str], None]) -> List[str]:
+    """Normaliza a seleção de idiomas de destino da UI (um código ou uma lista) numa lista sem repetições."""
+    if not to_lang_ui:
+        return []
+    return [to_lang_ui] if isinstance(to_lang_ui, str) else list(dict.fromkeys(to_lang_ui))
 
+def resolve_source_language(input_epub_path: str, from_lang_ui: str) -> str:
+    """Resolve o idioma de origem: se for "auto", detecta a partir de uma amostra dos primeiros documentos do EPUB."""
     final_from_lang = from_lang_ui
     if final_from_lang == "auto":
         try:
@@ -323,12 +987,12 @@ def gradio_translate_epub(
             sample_text = ""
             for item_idx, item_doc in enumerate(temp_book_for_lang_detect.get_items_of_type(ebooklib.ITEM_DOCUMENT)):
                 if item_idx < 5:
-                    soup = BeautifulSoup(item_doc.get_content(), 'html.parser')
+                    soup = bs4.BeautifulSoup(item_doc.get_content(), 'html.parser')
                     sample_text += soup.get_text(separator=' ', strip=True)[:200] + " "
                 if len(sample_text) > 1000: break
 
             if sample_text.strip():
-                detected = detect(sample_text.strip()).upper().split('-')[0]
+                detected = detect_language(sample_text.strip()).upper().split('-')[0]
                 if any(detected == lang_tuple[1] for lang_tuple in COMMON_LANGUAGES if lang_tuple[1] != "auto"):
                     final_from_lang = detected
                     gr.Info(f"Auto-detected source language for translation as: {final_from_lang}")
@@ -341,52 +1005,679 @@ def gradio_translate_epub(
         except Exception as e:
             final_from_lang = "EN"
             gr.Warning(f"Error during pre-translation language auto-detection: {type(e).__name__}. Assuming '{final_from_lang}'.")
+    return final_from_lang
+
+def format_duration(seconds: float) -> str:
+    """Formata uma duração como HH:MM:SS, com as horas sem limite (trabalhos longos passam de 24 h)."""
+    hours, remainder = divmod(int(round(seconds)), 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+class TranslationProgress:
+    """
+    Acompanha um job de tradução: progresso global ponderado pelo `char_count` de cada capítulo,
+    vazão móvel (blocos/min, tokens/s) e ETA calculado a partir dos caracteres que ainda faltam.
+    `record_tokens` é chamado pelas threads de tradução; os demais métodos, pela thread do job.
+    """
+    def __init__(
+        self,
+        chapter_char_counts: List[int],
+        chapter_block_chars: List[int],
+        progress=None,
+        window_seconds: float = THROUGHPUT_WINDOW_SECONDS,
+        job_control: Optional[TranslationJobControl] = None
+    ):
+        self.chapter_char_counts = chapter_char_counts
+        self.chapter_block_chars = chapter_block_chars
+        self.chapter_done_chars = [0] * len(chapter_char_counts)
+        # Capítulos sem blocos traduzíveis não entram no total (nunca avançariam).
+        self.total_chars = sum(count for count, block_chars in zip(chapter_char_counts, chapter_block_chars) if block_chars)
+        self.progress = progress
+        self.window_seconds = window_seconds
+        self.job_control = job_control
+        self.started_at = time.monotonic()
+        self._clock_stopped_at: Optional[float] = None
+        self._clock_stopped_total = 0.0
+        self.blocks_done = 0
+        self.blocks_failed = 0
+        self.translated_chars = 0.0 # Caracteres ponderados só dos blocos que receberam resposta do modelo
+        self.tokens_done = 0
+        self._events = collections.deque() # (instante, blocos, tokens, caracteres ponderados)
+        self._lock = threading.Lock()
+
+    def stop_clock(self):
+        """Para o relógio de tempo ativo (ex.: durante a exportação de um EPUB); `start_clock` o retoma."""
+        if self._clock_stopped_at is None:
+            self._clock_stopped_at = time.monotonic()
+
+    def start_clock(self):
+        if self._clock_stopped_at is not None:
+            self._clock_stopped_total += time.monotonic() - self._clock_stopped_at
+            self._clock_stopped_at = None
+
+    def active_seconds(self) -> float:
+        """Tempo gasto traduzindo: desde o início, menos as pausas do job e os intervalos com o relógio parado."""
+        end = self._clock_stopped_at if self._clock_stopped_at is not None else time.monotonic()
+        paused = self.job_control.paused_seconds(until=end) if self.job_control is not None else 0.0
+        return max(0.0, end - self.started_at - self._clock_stopped_total - paused)
+
+    def record_tokens(self, completion_tokens: int):
+        with self._lock:
+            self.tokens_done += completion_tokens
+            self._events.append((time.monotonic(), 0, completion_tokens, 0.0))
+
+    def block_done(self, chapter_pos: int, block_chars: int, translated: bool = True):
+        """
+        Marca um bloco como concluído. Blocos cuja requisição falhou (`translated` False) avançam o progresso,
+        mas não entram na vazão, no ETA nem nos caracteres traduzidos.
+        """
+        block_total = self.chapter_block_chars[chapter_pos]
+        weighted_chars = self.chapter_char_counts[chapter_pos] * block_chars / block_total if block_total else 0.0
+        with self._lock:
+            self.chapter_done_chars[chapter_pos] += block_chars
+            if not translated:
+                self.blocks_failed += 1
+                return
+            self.blocks_done += 1
+            self.translated_chars += weighted_chars
+            self._events.append((time.monotonic(), 1, 0, weighted_chars))
+
+    def remaining_chars(self) -> float:
+        return sum(
+            count * max(0.0, 1 - done / block_total)
+            for count, block_total, done in zip(self.chapter_char_counts, self.chapter_block_chars, self.chapter_done_chars)
+            if block_total
+        )
+
+    def rates(self) -> Tuple[float, float, float]:
+        """Retorna (blocos/min, tokens/s, caracteres/s) na janela móvel."""
+        now = time.monotonic()
+        with self._lock:
+            while self._events and now - self._events[0][0] > self.window_seconds:
+                self._events.popleft()
+            events = list(self._events)
+        span = max(1e-6, now - max(self.started_at, now - self.window_seconds))
+        blocks = sum(event[1] for event in events)
+        tokens = sum(event[2] for event in events)
+        chars = sum(event[3] for event in events)
+        return blocks / span * 60, tokens / span, chars / span
+
+    def eta_seconds(self) -> Optional[float]:
+        _, _, chars_per_second = self.rates()
+        return self.remaining_chars() / chars_per_second if chars_per_second > 0 else None
 
+    def describe(self) -> str:
+        blocks_per_minute, tokens_per_second, _ = self.rates()
+        eta = self.eta_seconds()
+        eta_text = format_duration(eta) if eta is not None else "--:--:--"
+        return f"{blocks_per_minute:.1f} blocks/min · {tokens_per_second:.1f} tok/s · ETA {eta_text}"
+
+    def update(self, desc_prefix: str):
+        """Envia o progresso global e a vazão atual para a barra de progresso (e para o log)."""
+        fraction = 1 - self.remaining_chars() / self.total_chars if self.total_chars else 0.0
+        desc = f"{desc_prefix} | {self.describe()}"
+        print(f"PROGRESS: {fraction:.1%} {desc}")
+        if self.progress is not None:
+            self.progress(fraction, desc=desc)
+
+def build_translation_schedule(chapter_jobs: List[Dict[str, Any]], preview_mode: str) -> Tuple[List[Tuple[int, List[int]]], List[Tuple[int, List[int]]]]:
+    """
+    Divide o trabalho em duas fases: o conjunto de pré-visualização escolhido pelo usuário e o restante.
+    Cada fase é uma lista de (posição do capítulo em chapter_jobs, índices dos blocos a traduzir).
+    No modo "first_chapter" a pré-visualização usa o primeiro capítulo com blocos, pulando capas e folhas de rosto vazias.
+    """
+    preview_phase, remaining_phase = [], []
+    preview_chapter_pos = next((pos for pos, job in enumerate(chapter_jobs) if job["slots"]["blocks"]), None)
+    for pos, job in enumerate(chapter_jobs):
+        all_indices = list(range(len(job["slots"]["blocks"])))
+        if preview_mode == "first_chapter" and pos == preview_chapter_pos:
+            preview_indices = all_indices
+        elif preview_mode == "sample":
+            preview_indices = all_indices[:PREVIEW_SAMPLE_BLOCKS]
+        else:
+            preview_indices = []
+        remaining_indices = all_indices[len(preview_indices):]
+        if preview_indices:
+            preview_phase.append((pos, preview_indices))
+        if remaining_indices:
+            remaining_phase.append((pos, remaining_indices))
+    return preview_phase, remaining_phase
+
+def run_translation_phase(
+    client: "OpenAI",
+    chapter_jobs: List[Dict[str, Any]],
+    phase: List[Tuple[int, List[int]]],
+    model_name: str,
+    from_lang: str,
+    phase_label: str,
+    progress_tracker: "TranslationProgress",
+    concurrency: int = 1,
+    job_control: Optional[TranslationJobControl] = None,
+    fast_model_name: Optional[str] = None,
+    cascade_stats: Optional[CascadeStats] = None
+):
+    """Traduz os blocos de uma fase do agendamento, capítulo por capítulo e para todos os idiomas do job, atualizando o progresso a cada bloco."""
+    total_steps = len(phase)
+    for step, (pos, block_indices) in enumerate(phase):
+        job = chapter_jobs[pos]
+        chapter_desc = f"{phase_label} Ch. {step+1}/{total_steps} ('{job['name']}')"
+        progress_tracker.update(chapter_desc)
+        print(f"{phase_label} Processing chapter {step+1}/{total_steps}: {job['name']} ({len(block_indices)} blocks)")
+
+        def on_block_done(chapter_fraction: float, block_index: int, translated: bool, pos=pos, job=job, chapter_desc=chapter_desc):
+            progress_tracker.block_done(pos, job["slots"]["blocks"][block_index]["chars"], translated)
+            progress_tracker.update(f"{chapter_desc} {chapter_fraction:.0%}")
+
+        try:
+            translate_html_block_elements(
+                client, job["targets"], model_name, from_lang, job["name"],
+                progress_callback_chapter_blocks=on_block_done,
+                block_indices=block_indices,
+                concurrency=concurrency,
+                progress_tracker=progress_tracker,
+                job_control=job_control,
+                fast_model_name=fast_model_name,
+                cascade_stats=cascade_stats
+            )
+        except TranslationCancelled:
+            raise
+        except Exception as e_chap:
+            gr.Warning(f"Failed to process chapter '{job['name']}': {type(e_chap).__name__}. It may be left untranslated.")
+            traceback.print_exc()
+
+def write_translated_epub(book, chapter_jobs: List[Dict[str, Any]], to_lang: str, prefix: str = "translated_") -> str:
+    """Grava nos capítulos do livro o conteúdo atual no idioma `to_lang` e salva um EPUB temporário, retornando seu caminho."""
+    for job in chapter_jobs:
+        job["item"].set_content(render_chapter_html(job["targets"][to_lang]).encode('utf-8'))
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".epub", prefix=f"{prefix}{to_lang}_") as tmp_output_file:
+        output_epub_path = tmp_output_file.name
+    epub.write_epub(output_epub_path, book, {})
+    return output_epub_path
+
+def gradio_translate_epub(
+    epub_file_obj: tempfile._TemporaryFileWrapper,
+    model_name: str,
+    from_lang_ui: str,
+    to_lang_ui: Union[str, List[str]],
+    selected_chapter_indices: List[int],
+    preview_mode: str = "none",
+    continue_after_preview: bool = True,
+    concurrency: int = 1,
+    book_data: Optional[Dict[str, Any]] = None,
+    fast_model_name: Optional[str] = None,
+    session_id: Optional[str] = None,
+    progress=None
+):
+    """
+    Traduz os capítulos selecionados. É um gerador: quando há um conjunto de pré-visualização,
+    ele é traduzido primeiro e um EPUB parcial é emitido antes de seguir (ou parar) com o restante.
+    `book_data` (o book_data_state da UI) fornece o `char_count` de cada capítulo para o cálculo do ETA.
+    O job fica registrado sob `session_id` para poder ser pausado ou cancelado; se for cancelado,
+    os blocos já traduzidos são exportados num EPUB parcial.
+    `to_lang_ui` pode ter vários idiomas: o livro é lido e segmentado uma só vez, as requisições de todos
+    os idiomas passam pelo mesmo pool e cada emissão é uma lista com um EPUB por idioma.
+    Com `fast_model_name`, os blocos passam primeiro pelo modelo rápido e só os reprovados vão para `model_name`.
+    """
+    if progress is None:
+        progress = lambda *args, **kwargs: None
+    if not epub_file_obj:
+        gr.Error("Please upload an EPUB file first.")
+        yield None
+        return
+    if not model_name:
+        gr.Error("Please enter or select an Ollama model name.")
+        yield None
+        return
+    if not selected_chapter_indices:
+        gr.Warning("No chapters selected for translation. Nothing to do.")
+        yield None
+        return
+    target_langs = target_language_list(to_lang_ui)
+    if not target_langs:
+        gr.Warning("Please select at least one target language.")
+        yield None
+        return
+    fast_model_name = (fast_model_name or "").strip()
+    if fast_model_name == model_name:
+        fast_model_name = ""
+    cascade_stats = CascadeStats(fast_model_name, model_name, concurrency) if fast_model_name else None
+
+    input_epub_path = epub_file_obj.name
+
+    final_from_lang = resolve_source_language(input_epub_path, from_lang_ui)
+
+    job_control = register_translation_job(session_id) if session_id else TranslationJobControl()
+    backend_session, model_ready, progress_tracker = None, False, None
     try:
-        client = OpenAI(base_url=DEFAULT_OLLAMA_BASE_URL, api_key=DEFAULT_OLLAMA_API_KEY)
+        backend_session = get_backend_session()
         try:
-            client.models.list()
+            backend_session.check_connection()
         except Exception as conn_err:
             gr.Error(f"Failed to connect to Ollama server at {DEFAULT_OLLAMA_BASE_URL}. Error: {type(conn_err).__name__} - {conn_err}")
-            return None
+            yield None
+            return
+        client = backend_session.client
+
+        job_models = [name for name in (fast_model_name, model_name) if name]
+        for job_model in job_models:
+            if not backend_session.is_model_warm(job_model):
+                progress(0, desc=f"Loading model {job_model}...")
+            try:
+                warmup_stats = backend_session.warm_up(job_model)
+            except Exception as load_err:
+                gr.Warning(f"Failed to load model {job_model}. Error: {type(load_err).__name__} - {load_err}")
+                yield None
+                return
+            if warmup_stats:
+                gr.Info(format_warmup_report(warmup_stats))
+        model_ready = True
 
         book = epub.read_epub(input_epub_path)
         all_document_items = list(book.get_items_of_type(ebooklib.ITEM_DOCUMENT))
-        chapters_to_process_items = [all_document_items[i] for i in selected_chapter_indices if 0 <= i < len(all_document_items)]
+        valid_chapter_indices = [i for i in selected_chapter_indices if 0 <= i < len(all_document_items)]
 
-        if not chapters_to_process_items:
+        if not valid_chapter_indices:
             gr.Error("No valid chapters selected or found for processing.")
-            return None
+            yield None
+            return
 
-        total_chapters_for_progress = len(chapters_to_process_items)
         progress(0, desc="Starting translation...")
 
-        for i, item_to_translate in enumerate(chapters_to_process_items):
-            item_id_or_name = item_to_translate.get_name() or f"Document Index {all_document_items.index(item_to_translate)}"
-            progress_desc = f"Translating Ch. {i+1}/{total_chapters_for_progress} ('{item_id_or_name}')..."
-            progress( i / total_chapters_for_progress, desc=progress_desc)
-            print(f"Processing chapter {i+1}/{total_chapters_for_progress}: {item_id_or_name}")
-
+        # Cada capítulo é parseado e convertido em slots uma única vez, para todos os idiomas de destino;
+        # as fases de pré-visualização e de tradução completa preenchem os mesmos slots.
+        chapter_details = (book_data or {}).get("chapter_details") or []
+        chapter_jobs = []
+        for doc_index in valid_chapter_indices:
+            item_to_translate = all_document_items[doc_index]
+            item_id_or_name = item_to_translate.get_name() or f"Document Index {doc_index}"
             try:
-                soup = BeautifulSoup(item_to_translate.get_content(), 'html.parser')
-                translate_html_block_elements(client, soup, model_name, final_from_lang, to_lang_ui, item_id_or_name)
-                item_to_translate.set_content(str(soup).encode('utf-8'))
+                soup = bs4.BeautifulSoup(item_to_translate.get_content(), 'html.parser')
+                # Mesmo cálculo de get_epub_chapters_details, usado se o estado do livro não estiver disponível.
+                char_count = chapter_details[doc_index]["char_count"] if doc_index < len(chapter_details) else len(soup.get_text())
+                chapter_slots = extract_chapter_blocks(soup, item_id_or_name)
             except Exception as e_chap:
                 gr.Warning(f"Failed to process chapter '{item_id_or_name}': {type(e_chap).__name__}. It may be left untranslated.")
                 traceback.print_exc()
+                continue
+            chapter_jobs.append({
+                "item": item_to_translate,
+                "name": item_id_or_name,
+                "slots": chapter_slots,
+                "targets": {lang: slots_for_target_language(chapter_slots) for lang in target_langs},
+                "char_count": char_count
+            })
+
+        preview_phase, remaining_phase = build_translation_schedule(chapter_jobs, preview_mode)
+        # Cada bloco é traduzido uma vez por idioma, então o trabalho de cada capítulo se multiplica pelo número de idiomas.
+        progress_tracker = TranslationProgress(
+            [job["char_count"] * len(target_langs) for job in chapter_jobs],
+            [sum(block["chars"] for block in job["slots"]["blocks"]) * len(target_langs) for job in chapter_jobs],
+            progress,
+            job_control=job_control
+        )
+
+        try:
+            if preview_mode != "none" and not preview_phase:
+                print("GRADIO_TRANSLATE_EPUB: Nenhum bloco traduzível para a pré-visualização nos capítulos selecionados.")
+                if not continue_after_preview:
+                    gr.Warning("No translatable blocks found for the preview in the selected chapters. Translation stopped as requested.")
+                    yield None
+                    return
+                gr.Warning("No translatable blocks found for the preview in the selected chapters. Translating without a preview...")
+            if preview_phase:
+                run_translation_phase(client, chapter_jobs, preview_phase, model_name, final_from_lang, "[Preview]", progress_tracker, concurrency, job_control, fast_model_name, cascade_stats)
+                # A exportação e a entrega da pré-visualização não entram no tempo ativo usado nas estimativas.
+                progress_tracker.stop_clock()
+                preview_epub_paths = [write_translated_epub(book, chapter_jobs, lang, prefix="preview_") for lang in target_langs]
+                print(f"GRADIO_TRANSLATE_EPUB: EPUBs de pré-visualização salvos em: {', '.join(preview_epub_paths)}")
+                if not continue_after_preview:
+                    progress(1, desc="Preview complete!")
+                    gr.Info("Preview EPUB ready. Translation stopped after the preview as requested.")
+                    report_cascade_stats(cascade_stats)
+                    yield preview_epub_paths
+                    return
+                gr.Info("Preview EPUB ready for download. Continuing with the remaining blocks...")
+                yield preview_epub_paths
+                progress_tracker.start_clock()
 
-        progress(1, desc="Translation complete! Finalizing EPUB...")
+            run_translation_phase(client, chapter_jobs, remaining_phase, model_name, final_from_lang, "Translating", progress_tracker, concurrency, job_control, fast_model_name, cascade_stats)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".epub", prefix="translated_") as tmp_output_file:
-            output_epub_path = tmp_output_file.name
-        epub.write_epub(output_epub_path, book, {})
-        print(f"GRADIO_TRANSLATE_EPUB: EPUB traduzido salvo em: {output_epub_path}")
-        gr.Info("EPUB translation successful!")
-        return output_epub_path
+            progress_tracker.stop_clock()
+            progress(1, desc="Translation complete! Finalizing EPUB...")
+
+            output_epub_paths = [write_translated_epub(book, chapter_jobs, lang) for lang in target_langs]
+            elapsed_minutes = (time.monotonic() - progress_tracker.started_at) / 60
+            print(f"GRADIO_TRANSLATE_EPUB: EPUBs traduzidos salvos em: {', '.join(output_epub_paths)}. {progress_tracker.blocks_done} blocos, {progress_tracker.tokens_done} tokens em {elapsed_minutes:.1f} min.")
+            if progress_tracker.blocks_failed:
+                gr.Warning(f"EPUB translation finished, but {progress_tracker.blocks_failed} blocks could not be translated and keep the original text. {progress_tracker.blocks_done} blocks translated in {elapsed_minutes:.1f} min.")
+            else:
+                gr.Info(f"EPUB translation successful! {progress_tracker.blocks_done} blocks in {elapsed_minutes:.1f} min.")
+            report_cascade_stats(cascade_stats)
+            yield output_epub_paths
+        except TranslationCancelled:
+            # Os slots já traduzidos continuam válidos: exporta o que foi feito até aqui.
+            progress_tracker.stop_clock()
+            partial_epub_paths = [write_translated_epub(book, chapter_jobs, lang, prefix="partial_") for lang in target_langs]
+            print(f"GRADIO_TRANSLATE_EPUB: Tradução cancelada após {progress_tracker.blocks_done} blocos. EPUBs parciais salvos em: {', '.join(partial_epub_paths)}")
+            gr.Warning(f"Translation cancelled after {progress_tracker.blocks_done} blocks. A partial EPUB with the blocks translated so far is available for download.")
+            report_cascade_stats(cascade_stats)
+            yield partial_epub_paths
     except Exception as e_main:
         gr.Error(f"An unexpected error occurred: {type(e_main).__name__} - {e_main}")
         traceback.print_exc()
-        return None
+        yield None
+    finally:
+        # Também cobre o gerador sendo fechado pelo Gradio: nenhuma requisição continua depois disso.
+        job_control.cancel()
+        if session_id:
+            unregister_translation_job(session_id, job_control)
+        if progress_tracker is not None:
+            progress_tracker.stop_clock()
+            record_run_throughput(throughput_model_key(model_name, fast_model_name), concurrency, progress_tracker)
+        if model_ready:
+            # Em segundo plano, para não atrasar a entrega do EPUB.
+            for job_model in job_models:
+                threading.Thread(target=backend_session.keep_alive, args=(job_model,), daemon=True).start()
+
+# --- Calibração de Modelos ---
+
+def sample_book_blocks(epub_path: str, sample_size: int = CALIBRATION_SAMPLE_BLOCKS) -> List[str]:
+    """Retorna uma amostra de blocos HTML reais do livro, espaçados uniformemente do início ao fim."""
+    book = epub.read_epub(epub_path)
+    candidate_blocks = []
+    for item in book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
+        soup = bs4.BeautifulSoup(item.get_content(), 'html.parser')
+        for element_tag in select_block_elements(soup):
+            # Ignora blocos triviais (títulos curtos, itens vazios) que não dizem nada sobre o desempenho.
+            if len(element_tag.get_text(strip=True)) >= 40:
+                candidate_blocks.append(str(element_tag))
+    if len(candidate_blocks) <= sample_size:
+        return candidate_blocks
+    step = len(candidate_blocks) / sample_size
+    return [candidate_blocks[int(k * step)] for k in range(sample_size)]
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Posto mais próximo: o menor valor com pelo menos `pct`% da amostra abaixo ou igual a ele.
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def benchmark_configuration(client: "OpenAI", html_fragments: List[str], model_name: str, concurrency: int, from_lang: str, to_lang: str) -> Dict[str, Any]:
+    """Traduz a amostra com um modelo e nível de concorrência, medindo vazão, latência e falhas estruturais."""
+    def timed_request(html_fragment: str) -> Tuple[float, int, bool]:
+        start = time.perf_counter()
+        try:
+            translated_text, completion_tokens = request_translation(client, html_fragment, model_name, from_lang, to_lang)
+            structurally_ok = is_single_element_html(translated_text)
+        except Exception as e:
+            print(f"CALIBRATION: ERRO na requisição ao modelo {model_name}: {type(e).__name__} - {e}")
+            completion_tokens, structurally_ok = 0, False
+        return time.perf_counter() - start, completion_tokens, structurally_ok
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        measurements = list(executor.map(timed_request, html_fragments))
+    wall_time = time.perf_counter() - wall_start
+
+    latencies = sorted(m[0] for m in measurements)
+    total_tokens = sum(m[1] for m in measurements)
+    failures = sum(1 for m in measurements if not m[2])
+    return {
+        "model": model_name,
+        "concurrency": concurrency,
+        "blocks": len(html_fragments),
+        "wall_time_s": round(wall_time, 2),
+        "blocks_per_min": round(len(html_fragments) / wall_time * 60, 2) if wall_time > 0 else 0.0,
+        "tokens_per_s": round(total_tokens / wall_time, 2) if wall_time > 0 else 0.0,
+        "latency_p50_s": round(_percentile(latencies, 50), 2),
+        "latency_p95_s": round(_percentile(latencies, 95), 2),
+        "failure_rate": round(failures / len(html_fragments), 3) if html_fragments else 0.0,
+    }
+
+def pick_best_configuration(results: List[Dict[str, Any]], max_failure_rate: float = CALIBRATION_MAX_FAILURE_RATE) -> Optional[Dict[str, Any]]:
+    """Escolhe a configuração de maior vazão (blocos/min) entre as que respeitam o piso de qualidade."""
+    eligible = [r for r in results if "error" not in r and r["failure_rate"] <= max_failure_rate]
+    return max(eligible, key=lambda r: r["blocks_per_min"]) if eligible else None
+
+def calibration_host_key(base_url: str = DEFAULT_OLLAMA_BASE_URL) -> str:
+    """Chave do cache: a máquina que roda a aplicação e o servidor Ollama usado."""
+    return f"{socket.gethostname()}|{base_url}"
+
+def _read_json_cache(cache_path: str) -> Dict[str, Any]:
+    try:
+        with open(cache_path, encoding="utf-8") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+def _write_json_cache(cache_path: str, cache: Dict[str, Any]):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as cache_file:
+            json.dump(cache, cache_file, indent=2)
+    except OSError as e:
+        print(f"CACHE: Não foi possível salvar o cache em {cache_path}. Erro: {e}")
+
+def load_cached_calibration() -> Optional[Dict[str, Any]]:
+    """Retorna a última calibração salva para este host, se houver."""
+    return _read_json_cache(CALIBRATION_CACHE_PATH).get(calibration_host_key())
+
+def save_calibration(results: List[Dict[str, Any]], best: Optional[Dict[str, Any]]):
+    cache = _read_json_cache(CALIBRATION_CACHE_PATH)
+    cache[calibration_host_key()] = {"timestamp": time.time(), "results": results, "best": best}
+    _write_json_cache(CALIBRATION_CACHE_PATH, cache)
+
+def calibrate_for_book(
+    epub_path: str,
+    models: List[str],
+    concurrency_levels: List[int],
+    from_lang_ui: str,
+    to_lang: str,
+    progress=None
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Roda uma amostra de blocos do livro em cada modelo candidato e nível de concorrência,
+    salva os resultados no cache deste host e retorna (resultados, melhor configuração).
+    """
+    from_lang = resolve_source_language(epub_path, from_lang_ui)
+    html_fragments = sample_book_blocks(epub_path)
+    if not html_fragments:
+        raise ValueError("No text blocks long enough to calibrate with were found in the EPUB.")
+
+    backend_session = get_backend_session()
+    client = backend_session.client
+    results = []
+    total_runs = len(models) * len(concurrency_levels)
+    run_index = 0
+    for model_name in models:
+        try:
+            # Aquecimento: o carregamento do modelo não entra na medição. Forçado porque, ao alternar
+            # entre modelos, o servidor pode ter descarregado um modelo que a sessão ainda considera aquecido.
+            backend_session.warm_up(model_name, force=True)
+        except Exception as e:
+            print(f"CALIBRATION: Modelo {model_name} indisponível. Erro: {type(e).__name__} - {e}")
+            results.append({"model": model_name, "concurrency": None, "error": f"{type(e).__name__}: {e}"})
+            run_index += len(concurrency_levels)
+            continue
+        for concurrency in concurrency_levels:
+            if progress is not None:
+                progress(run_index / total_runs, desc=f"Calibrating {model_name} (concurrency {concurrency})...")
+            print(f"CALIBRATION: Medindo {model_name} com concorrência {concurrency} em {len(html_fragments)} blocos.")
+            results.append(benchmark_configuration(client, html_fragments, model_name, concurrency, from_lang, to_lang))
+            run_index += 1
+
+    best = pick_best_configuration(results)
+    save_calibration(results, best)
+    return results, best
+
+def format_calibration_report(results: List[Dict[str, Any]], best: Optional[Dict[str, Any]]) -> str:
+    """Monta uma tabela Markdown com os resultados da calibração e a recomendação."""
+    lines = [
+        "| Model | Concurrency | Blocks/min | Tokens/s | p50 (s) | p95 (s) | Structural failures |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for r in results:
+        if "error" in r:
+            lines.append(f"| {r['model']} | - | - | - | - | - | {r['error']} |")
+        else:
+            lines.append(
+                f"| {r['model']} | {r['concurrency']} | {r['blocks_per_min']} | {r['tokens_per_s']} | "
+                f"{r['latency_p50_s']} | {r['latency_p95_s']} | {r['failure_rate']:.0%} |"
+            )
+    if best:
+        lines.append(f"\n**Recommended:** `{best['model']}` with concurrency {best['concurrency']} ({best['blocks_per_min']} blocks/min).")
+    else:
+        lines.append(f"\n**No configuration met the quality floor** (max {CALIBRATION_MAX_FAILURE_RATE:.0%} structural failures).")
+    return "\n".join(lines)
+
+def _parse_csv_list(text: str) -> List[str]:
+    return [part.strip() for part in (text or "").split(",") if part.strip()]
+
+def gradio_calibrate_models(epub_file_obj, models_text: str, concurrency_text: str, from_lang_ui: str, to_lang_ui: Union[str, List[str]], progress=None):
+    """Handler da UI: roda a calibração e, se houver recomendação, já a aplica ao modelo e à concorrência."""
+    if not epub_file_obj:
+        gr.Warning("Please upload an EPUB file first.")
+        return gr.update(), gr.update(), gr.update()
+    models = _parse_csv_list(models_text) or SUGGESTED_MODELS
+    try:
+        concurrency_levels = [min(MAX_CONCURRENCY, max(1, int(level))) for level in _parse_csv_list(concurrency_text)] or CALIBRATION_CONCURRENCY_LEVELS
+    except ValueError:
+        gr.Warning("Concurrency levels must be a comma-separated list of integers.")
+        return gr.update(), gr.update(), gr.update()
+    try:
+        # A vazão não depende do idioma de destino: calibra com o primeiro selecionado.
+        target_langs = target_language_list(to_lang_ui) or ["PT-BR"]
+        results, best = calibrate_for_book(epub_file_obj.name, models, concurrency_levels, from_lang_ui, target_langs[0], progress)
+    except Exception as e:
+        gr.Warning(f"Calibration failed: {type(e).__name__} - {e}")
+        traceback.print_exc()
+        return gr.update(), gr.update(), gr.update()
+    report = format_calibration_report(results, best)
+    if not best:
+        return gr.update(value=report), gr.update(), gr.update()
+    gr.Info(f"Selected {best['model']} with concurrency {best['concurrency']}.")
+    return gr.update(value=report), gr.update(value=best["model"]), gr.update(value=best["concurrency"])
+
+# --- Estimativa Prévia de Custo e Duração ---
+
+def throughput_model_key(model_name: str, fast_model_name: Optional[str] = None) -> str:
+    """Nome sob o qual a vazão é registrada: uma cascata tem vazão própria e não se mistura à do modelo grande sozinho."""
+    return f"{fast_model_name}+{model_name}" if fast_model_name and fast_model_name != model_name else model_name
+
+def record_run_throughput(model_name: str, concurrency: int, progress_tracker: "TranslationProgress"):
+    """
+    Acumula a vazão medida num job (caracteres de texto traduzidos por segundo, na mesma unidade do ETA)
+    no histórico deste host, por modelo e nível de concorrência.
+    """
+    elapsed_seconds = progress_tracker.active_seconds()
+    translated_chars = progress_tracker.translated_chars
+    if progress_tracker.blocks_done == 0 or elapsed_seconds <= 0 or translated_chars <= 0:
+        return
+    if progress_tracker.blocks_failed > progress_tracker.blocks_done:
+        # Um job em que a maioria das requisições falhou mediria a velocidade das falhas, não a do modelo.
+        print(f"RECORD_RUN_THROUGHPUT: {progress_tracker.blocks_failed} blocos falharam e {progress_tracker.blocks_done} foram traduzidos. Vazão não registrada.")
+        return
+    history = _read_json_cache(THROUGHPUT_HISTORY_PATH)
+    host_runs = history.setdefault(calibration_host_key(), {})
+    run_totals = host_runs.setdefault(f"{model_name}|{int(concurrency)}", {"chars": 0.0, "blocks": 0, "tokens": 0, "seconds": 0.0})
+    run_totals["chars"] += translated_chars
+    run_totals["blocks"] += progress_tracker.blocks_done
+    run_totals["tokens"] += progress_tracker.tokens_done
+    run_totals["seconds"] += elapsed_seconds
+    run_totals["timestamp"] = time.time()
+    _write_json_cache(THROUGHPUT_HISTORY_PATH, history)
+
+def find_measured_throughput(model_name: str, concurrency: int) -> Optional[Dict[str, Any]]:
+    """
+    Procura a vazão medida para o modelo neste host. Prefere jobs anteriores à calibração e,
+    dentro de cada fonte, o mesmo nível de concorrência ao mais próximo.
+    Retorna {"source", "concurrency", "chars_per_s" ou "tokens_per_s"} ou None.
+    """
+    host_runs = _read_json_cache(THROUGHPUT_HISTORY_PATH).get(calibration_host_key(), {})
+    runs = []
+    for key, totals in host_runs.items():
+        run_model, _, run_concurrency = key.rpartition("|")
+        if run_model == model_name and totals.get("seconds"):
+            runs.append({"source": "run", "concurrency": int(run_concurrency), "chars_per_s": totals["chars"] / totals["seconds"]})
+    calibration = load_cached_calibration() or {}
+    calibrated = [
+        {"source": "calibration", "concurrency": r["concurrency"], "tokens_per_s": r["tokens_per_s"]}
+        for r in calibration.get("results", [])
+        if r.get("model") == model_name and "error" not in r and r.get("tokens_per_s")
+    ]
+    for candidates in (runs, calibrated):
+        exact = [c for c in candidates if c["concurrency"] == concurrency]
+        if exact:
+            return exact[0]
+    candidates = runs or calibrated
+    return min(candidates, key=lambda c: abs(c["concurrency"] - concurrency)) if candidates else None
+
+def estimate_translation_job(
+    chapter_details: List[Dict[str, Any]],
+    selected_chapter_indices: List[int],
+    model_name: str,
+    from_lang: str,
+    to_lang: Union[str, List[str]],
+    concurrency: int = 1
+) -> Dict[str, Any]:
+    """
+    Estima, antes de traduzir, o tamanho do job para os capítulos selecionados: blocos (uma requisição cada),
+    tokens de prompt (incluindo o system_prompt repetido em toda requisição) e de resposta, e a duração
+    prevista a partir da vazão já medida neste host.
+    """
+    target_langs = target_language_list(to_lang)
+    selected = [chapter_details[i] for i in selected_chapter_indices if 0 <= i < len(chapter_details)]
+    blocks = sum(ch.get("block_count", 0) for ch in selected)
+    # Cada idioma de destino repete todas as requisições, com o seu próprio system_prompt.
+    block_tokens = sum(ch.get("block_html_chars", 0) for ch in selected) / CHARS_PER_TOKEN_ESTIMATE * len(target_langs)
+    system_prompt_tokens = blocks * sum(len(system_prompt(from_lang, lang)) for lang in target_langs) / CHARS_PER_TOKEN_ESTIMATE
+    completion_tokens = block_tokens * COMPLETION_LENGTH_RATIO
+    text_chars = sum(ch["char_count"] for ch in selected if ch.get("block_count")) * len(target_langs)
+
+    throughput = find_measured_throughput(model_name, int(concurrency)) if model_name else None
+    duration_s = None
+    if throughput and "chars_per_s" in throughput:
+        duration_s = text_chars / throughput["chars_per_s"]
+    elif throughput:
+        duration_s = completion_tokens / throughput["tokens_per_s"]
+    return {
+        "chapters": len(selected),
+        "languages": len(target_langs),
+        "blocks": blocks,
+        "requests": blocks * len(target_langs),
+        "prompt_tokens": int(block_tokens + system_prompt_tokens),
+        "system_prompt_tokens": int(system_prompt_tokens),
+        "completion_tokens": int(completion_tokens),
+        "duration_s": duration_s,
+        "throughput": throughput,
+    }
+
+def format_job_estimate(estimate: Dict[str, Any], model_name: str) -> str:
+    lines = [
+        f"{estimate['chapters']} chapters, ~{estimate['blocks']} blocks"
+        + (f" x {estimate['languages']} target languages" if estimate['languages'] > 1 else "")
+        + f" ({estimate['requests']} requests).",
+        f"~{estimate['prompt_tokens']:,} prompt tokens ({estimate['system_prompt_tokens']:,} of them system prompt), ~{estimate['completion_tokens']:,} completion tokens.",
+    ]
+    throughput = estimate["throughput"]
+    if estimate["duration_s"] is None:
+        lines.append(f"No throughput measured yet for {model_name or 'this model'} on this host: run a translation or a calibration to get a duration estimate.")
+    else:
+        duration_text = format_duration(estimate["duration_s"])
+        source_text = "previous runs" if throughput["source"] == "run" else "calibration"
+        lines.append(f"Estimated duration: {duration_text} (from {source_text} of {model_name} with concurrency {throughput['concurrency']}; model loading not included).")
+    return "\n".join(lines)
+
+def gradio_estimate_job(selected_chapter_indices: List[int], model_name: str, concurrency: int, from_lang_ui: str, to_lang_ui: List[str], book_data: Dict, fast_model_name: str = "") -> str:
+    """Atualiza a estimativa exibida na UI sempre que a seleção de capítulos ou a configuração mudam."""
+    chapter_details = (book_data or {}).get("chapter_details")
+    if not chapter_details or not selected_chapter_indices or not target_language_list(to_lang_ui):
+        return ""
+    model_name = throughput_model_key((model_name or "").strip(), (fast_model_name or "").strip())
+    # O idioma só muda o tamanho do system_prompt; "auto" é uma boa aproximação antes da detecção.
+    estimate = estimate_translation_job(chapter_details, selected_chapter_indices, model_name, from_lang_ui, to_lang_ui, concurrency or 1)
+    return format_job_estimate(estimate, model_name)
 
 # --- Interface Gradio (Com Alterações) ---
 css = """
@@ -406,141 +1697,319 @@ css = """
 }
 """
 
-with gr.Blocks(theme='earneleh/paris', css=css) as app:
-    t = translations[initial_lang]
-    gr.Markdown(t['app_title'])
-    gr.Markdown(t['app_subtitle'])
-
-    # NOVO: Estado centralizado para armazenar os dados do livro.
-    book_data_state = gr.State({})
-
-    with gr.Row():
-        with gr.Column(scale=3, elem_classes=['newBg']):
-            gr.Markdown(t['section_1_title'])
-            epub_upload_btn = gr.UploadButton(t['upload_button_text'], file_types=[".epub"], type="filepath", elem_classes='sendBook')
-
-            gr.Markdown(t['section_2_title'])
-            model_name_input = gr.Textbox(
-                label=t['model_name_label'], 
-                placeholder=t['model_name_placeholder'], 
-                value=DEFAULT_MODEL, 
-                elem_classes="meuBloco"
-            )
+def build_app():
+    """Constrói a interface Gradio. Fica numa função para que importar este módulo não monte (nem importe) a UI."""
+    # A última calibração deste host (se houver) define o modelo e a concorrência iniciais.
+    cached_calibration = load_cached_calibration()
+    calibrated_best = cached_calibration.get("best") if cached_calibration else None
 
-            with gr.Row(elem_classes="small_gap meuBloco"):
-                lang_from_dropdown = gr.Dropdown(
-                    label=t['from_language_label'], 
-                    choices=COMMON_LANGUAGES, 
-                    value="auto", 
-                    elem_classes="meuBloco title me-1"
-                )
-                lang_to_dropdown = gr.Dropdown(
-                    label=t['to_language_label'], 
-                    choices=[(n, c) for n, c in COMMON_LANGUAGES if c != "auto"], 
-                    value="PT-BR", 
-                    elem_classes="meuBloco ms-1"
-                )
+    with gr.Blocks(theme='earneleh/paris', css=css) as app:
+        gr.Markdown(t['app_title'])
+        gr.Markdown(t['app_subtitle'])
 
-            with gr.Accordion(label=t['chapters_accordion_label'], elem_classes="meuBloco detalhes", open=False):
-                with gr.Row():
-                    with gr.Column(scale=8, elem_classes=['newBg']):
-                        gr.Markdown(t['section_3_title'])
-                    with gr.Column(scale=3, elem_classes=['newBg']):
-                        # O texto deste botão provavelmente mudará dinamicamente (Select/Deselect All)
-                        # mas este é o valor inicial.
-                        toggle_chapters_btn = gr.Button(t['deselect_all_btn'])
-                chapters_selector = gr.CheckboxGroup(
-                    label=t['chapters_selector_label'], 
-                    choices=[], 
-                    value=[], 
-                    interactive=False, 
-                    elem_classes="meuBloco px-0"
-                )
+        # NOVO: Estado centralizado para armazenar os dados do livro.
+        book_data_state = gr.State({})
 
-            with gr.Accordion(label=t['details_accordion_label'], elem_classes="meuBloco detalhes", open=False):
-                epub_title_display = gr.Textbox(
-                    label=t['book_title_label'], 
-                    elem_classes="BookDetails", 
-                    interactive=True, 
-                    lines=1
-                )
-                epub_author_display = gr.Textbox(
-                    label=t['book_author_label'], 
-                    elem_classes="BookDetails", 
-                    interactive=True, 
-                    lines=1
+        with gr.Row():
+            with gr.Column(scale=3, elem_classes=['newBg']):
+                gr.Markdown(t['section_1_title'])
+                epub_upload_btn = gr.UploadButton(t['upload_button_text'], file_types=[".epub"], type="filepath", elem_classes='sendBook')
+
+                gr.Markdown(t['section_2_title'])
+                model_name_input = gr.Textbox(
+                    label=t['model_name_label'], 
+                    placeholder=t['model_name_placeholder'], 
+                    value=calibrated_best["model"] if calibrated_best else DEFAULT_MODEL, 
+                    elem_classes="meuBloco"
                 )
-                chapter_count_display = gr.Textbox(
-                    label=t['epub_structure_info_label'], 
-                    elem_classes="BookDetails", 
-                    interactive=True, 
-                    lines=1
+                concurrency_slider = gr.Slider(
+                    label=t['concurrency_label'],
+                    minimum=1,
+                    maximum=MAX_CONCURRENCY,
+                    step=1,
+                    value=calibrated_best["concurrency"] if calibrated_best else 1,
+                    elem_classes="meuBloco"
                 )
 
-            gr.Markdown(t['section_4_title'])
-            submit_btn = gr.Button(t['translate_button_text'], variant="primary", scale=2, elem_classes='translateButton')
-            progress_bar = gr.Progress()
-            output_file_display = gr.File(label=t['download_label'], interactive=False)
-
-    # --- Eventos Gradio (Com Alterações) ---
-
-    upload_outputs = [
-        chapters_selector,
-        lang_from_dropdown,
-        lang_to_dropdown,
-        epub_title_display,
-        epub_author_display,
-        chapter_count_display,
-        book_data_state  # A última saída agora é o estado do livro
-    ]
+                with gr.Row(elem_classes="small_gap meuBloco"):
+                    lang_from_dropdown = gr.Dropdown(
+                        label=t['from_language_label'], 
+                        choices=COMMON_LANGUAGES, 
+                        value="auto", 
+                        elem_classes="meuBloco title me-1"
+                    )
+                    lang_to_dropdown = gr.Dropdown(
+                        label=t['to_language_label'], 
+                        choices=[(n, c) for n, c in COMMON_LANGUAGES if c != "auto"], 
+                        value=["PT-BR"], 
+                        multiselect=True, 
+                        elem_classes="meuBloco ms-1"
+                    )
 
-    epub_upload_btn.upload(
-        fn=parse_epub_metadata_and_chapters,
-        inputs=[epub_upload_btn],
-        outputs=upload_outputs,
-        show_progress="upload"
-    )
+                with gr.Accordion(label=t['chapters_accordion_label'], elem_classes="meuBloco detalhes", open=False):
+                    with gr.Row():
+                        with gr.Column(scale=8, elem_classes=['newBg']):
+                            gr.Markdown(t['section_3_title'])
+                        with gr.Column(scale=3, elem_classes=['newBg']):
+                            # O texto deste botão provavelmente mudará dinamicamente (Select/Deselect All)
+                            # mas este é o valor inicial.
+                            toggle_chapters_btn = gr.Button(t['deselect_all_btn'])
+                    chapters_selector = gr.CheckboxGroup(
+                        label=t['chapters_selector_label'], 
+                        choices=[], 
+                        value=[], 
+                        interactive=False, 
+                        elem_classes="meuBloco px-0"
+                    )
 
-    # NOVO: Função de toggle que usa o estado do livro
-    def toggle_all_chapters(current_selection: List[int], book_data: Dict):
-        """Seleciona ou deseleciona todos os capítulos usando os dados do book_data_state."""
-        if not book_data or "chapter_choices_for_ui" not in book_data:
-            gr.Warning("Please upload an EPUB file first.")
-            return gr.update(), gr.update() # Não faz nada se o estado estiver vazio
+                with gr.Accordion(label=t['preview_accordion_label'], elem_classes="meuBloco detalhes", open=False):
+                    preview_mode_radio = gr.Radio(
+                        label=t['preview_mode_label'],
+                        choices=[
+                            (t['preview_mode_none'], "none"),
+                            (t['preview_mode_first_chapter'], "first_chapter"),
+                            (t['preview_mode_sample'], "sample"),
+                        ],
+                        value="none",
+                        elem_classes="meuBloco"
+                    )
+                    preview_continue_checkbox = gr.Checkbox(
+                        label=t['preview_continue_label'],
+                        value=True,
+                        elem_classes="meuBloco"
+                    )
 
-        print("--- TOGGLE BUTTON CLICKED ---")
-        print(f"Accessing book data from state. Title: {book_data.get('title')}")
+                with gr.Accordion(label=t['cascade_accordion_label'], elem_classes="meuBloco detalhes", open=False):
+                    # Vazio = cascata desligada; todos os blocos vão direto para o modelo principal.
+                    cascade_model_input = gr.Textbox(
+                        label=t['cascade_model_label'],
+                        placeholder=t['cascade_model_placeholder'],
+                        value="",
+                        elem_classes="meuBloco"
+                    )
 
-        all_chapter_indices = [choice[1] for choice in book_data["chapter_choices_for_ui"]]
-        if not all_chapter_indices:
-            return gr.update(), gr.update(value=t['no_chapters_found'])
+                with gr.Accordion(label=t['calibration_accordion_label'], elem_classes="meuBloco detalhes", open=False):
+                    calibration_models_input = gr.Textbox(
+                        label=t['calibration_models_label'],
+                        value=", ".join(SUGGESTED_MODELS),
+                        elem_classes="meuBloco"
+                    )
+                    calibration_concurrency_input = gr.Textbox(
+                        label=t['calibration_concurrency_label'],
+                        value=", ".join(str(level) for level in CALIBRATION_CONCURRENCY_LEVELS),
+                        elem_classes="meuBloco"
+                    )
+                    calibrate_btn = gr.Button(t['calibration_button_text'])
+                    calibration_report_display = gr.Markdown(
+                        format_calibration_report(cached_calibration["results"], calibrated_best) if cached_calibration else ""
+                    )
 
-        if len(current_selection) < len(all_chapter_indices):
-            # Se nem todos estiverem selecionados, seleciona todos
-            return gr.update(value=all_chapter_indices), gr.update(value=t['deselect_all_btn'])
-        else:
-            # Se todos estiverem selecionados, deseleciona todos
-            return gr.update(value=[]), gr.update(value=t['deselect_all_btn'])
-
-    # NOVO: Evento de clique do botão de toggle que passa o estado como entrada
-    toggle_chapters_btn.click(
-        fn=toggle_all_chapters,
-        inputs=[chapters_selector, book_data_state],
-        outputs=[chapters_selector, toggle_chapters_btn]
-    )
+                with gr.Accordion(label=t['details_accordion_label'], elem_classes="meuBloco detalhes", open=False):
+                    epub_title_display = gr.Textbox(
+                        label=t['book_title_label'], 
+                        elem_classes="BookDetails", 
+                        interactive=True, 
+                        lines=1
+                    )
+                    epub_author_display = gr.Textbox(
+                        label=t['book_author_label'], 
+                        elem_classes="BookDetails", 
+                        interactive=True, 
+                        lines=1
+                    )
+                    chapter_count_display = gr.Textbox(
+                        label=t['epub_structure_info_label'], 
+                        elem_classes="BookDetails", 
+                        interactive=True, 
+                        lines=1
+                    )
+
+                gr.Markdown(t['section_4_title'])
+                estimate_display = gr.Textbox(label=t['estimate_label'], interactive=False, lines=3, elem_classes="meuBloco")
+                submit_btn = gr.Button(t['translate_button_text'], variant="primary", scale=2, elem_classes='translateButton')
+                with gr.Row():
+                    pause_btn = gr.Button(t['pause_button_text'], variant="secondary")
+                    stop_btn = gr.Button(t['stop_button_text'], variant="stop")
+                progress_bar = gr.Progress()
+                output_file_display = gr.File(label=t['download_label'], file_count="multiple", interactive=False)
+
+        # --- Eventos Gradio (Com Alterações) ---
 
-    submit_btn.click(
-        fn=gradio_translate_epub,
-        inputs=[
-            epub_upload_btn,
-            model_name_input,
+        upload_outputs = [
+            chapters_selector,
             lang_from_dropdown,
             lang_to_dropdown,
-            chapters_selector
-        ],
-        outputs=[output_file_display],
-    )
+            epub_title_display,
+            epub_author_display,
+            chapter_count_display,
+            book_data_state  # A última saída agora é o estado do livro
+        ]
+
+        epub_upload_btn.upload(
+            fn=parse_epub_metadata_and_chapters,
+            inputs=[epub_upload_btn],
+            outputs=upload_outputs,
+            show_progress="upload"
+        )
+
+        # NOVO: Função de toggle que usa o estado do livro
+        def toggle_all_chapters(current_selection: List[int], book_data: Dict):
+            """Seleciona ou deseleciona todos os capítulos usando os dados do book_data_state."""
+            if not book_data or "chapter_choices_for_ui" not in book_data:
+                gr.Warning("Please upload an EPUB file first.")
+                return gr.update(), gr.update() # Não faz nada se o estado estiver vazio
+
+            print("--- TOGGLE BUTTON CLICKED ---")
+            print(f"Accessing book data from state. Title: {book_data.get('title')}")
+
+            all_chapter_indices = [choice[1] for choice in book_data["chapter_choices_for_ui"]]
+            if not all_chapter_indices:
+                return gr.update(), gr.update(value=t['no_chapters_found'])
+
+            if len(current_selection) < len(all_chapter_indices):
+                # Se nem todos estiverem selecionados, seleciona todos
+                return gr.update(value=all_chapter_indices), gr.update(value=t['deselect_all_btn'])
+            else:
+                # Se todos estiverem selecionados, deseleciona todos
+                return gr.update(value=[]), gr.update(value=t['deselect_all_btn'])
+
+        # NOVO: Evento de clique do botão de toggle que passa o estado como entrada
+        toggle_chapters_btn.click(
+            fn=toggle_all_chapters,
+            inputs=[chapters_selector, book_data_state],
+            outputs=[chapters_selector, toggle_chapters_btn]
+        )
+
+        # gr.Progress precisa ser o valor padrão de um parâmetro do handler; como o Gradio só é
+        # importado aqui, os handlers com barra de progresso são embrulhados dentro da fábrica.
+        def translate_epub_handler(
+            epub_file_obj, model_name, from_lang_ui, to_lang_ui, selected_chapter_indices,
+            preview_mode, continue_after_preview, concurrency, book_data, fast_model_name,
+            request: gr.Request, progress=gr.Progress(track_tqdm=True)
+        ):
+            yield from gradio_translate_epub(
+                epub_file_obj, model_name, from_lang_ui, to_lang_ui, selected_chapter_indices,
+                preview_mode, continue_after_preview, concurrency, book_data,
+                fast_model_name=fast_model_name, session_id=request.session_hash, progress=progress
+            )
+
+        # O job de cada aba é identificado pelo session_hash da requisição.
+        def toggle_pause_handler(request: gr.Request):
+            paused = toggle_pause_translation_job(request.session_hash)
+            if paused is None:
+                gr.Warning("No translation is running.")
+                return gr.update(value=t['pause_button_text'])
+            return gr.update(value=t['resume_button_text'] if paused else t['pause_button_text'])
+
+        def stop_handler(request: gr.Request):
+            if cancel_translation_job(request.session_hash):
+                gr.Info("Stopping translation... A partial EPUB will be exported.")
+            else:
+                gr.Warning("No translation is running.")
+            return gr.update(value=t['pause_button_text'])
+
+        def cancel_on_disconnect(request: gr.Request):
+            # Aba fechada ou conexão perdida: não há mais quem receba o resultado.
+            cancel_translation_job(request.session_hash)
+
+        def preload_model_handler(model_name: str):
+            """Carrega o modelo assim que ele é escolhido, para que a tradução não pague o carregamento."""
+            model_name = (model_name or "").strip()
+            if not model_name:
+                return
+            backend_session = get_backend_session()
+            try:
+                backend_session.check_connection()
+                warmup_stats = backend_session.warm_up(model_name)
+            except Exception as e:
+                gr.Warning(f"Could not preload model {model_name}: {type(e).__name__} - {e}")
+                return
+            if warmup_stats:
+                gr.Info(format_warmup_report(warmup_stats))
+
+        def calibrate_models_handler(epub_file_obj, models_text, concurrency_text, from_lang_ui, to_lang_ui, progress=gr.Progress()):
+            return gradio_calibrate_models(epub_file_obj, models_text, concurrency_text, from_lang_ui, to_lang_ui, progress=progress)
+
+        submit_btn.click(
+            fn=translate_epub_handler,
+            inputs=[
+                epub_upload_btn,
+                model_name_input,
+                lang_from_dropdown,
+                lang_to_dropdown,
+                chapters_selector,
+                preview_mode_radio,
+                preview_continue_checkbox,
+                concurrency_slider,
+                book_data_state,
+                cascade_model_input
+            ],
+            outputs=[output_file_display],
+        ).then(
+            fn=lambda: gr.update(value=t['pause_button_text']),
+            outputs=[pause_btn]
+        )
+
+        # A estimativa acompanha a seleção de capítulos (inclusive a feita pelo upload) e a configuração.
+        gr.on(
+            triggers=[chapters_selector.change, model_name_input.change, concurrency_slider.change, lang_to_dropdown.change, cascade_model_input.change],
+            fn=gradio_estimate_job,
+            inputs=[chapters_selector, model_name_input, concurrency_slider, lang_from_dropdown, lang_to_dropdown, book_data_state, cascade_model_input],
+            outputs=[estimate_display],
+            show_progress="hidden"
+        )
+
+        # Textbox: `submit` (Enter) e `blur` em vez de `change`, que dispararia a cada tecla digitada.
+        for model_textbox in (model_name_input, cascade_model_input):
+            model_textbox.submit(fn=preload_model_handler, inputs=[model_textbox], show_progress="hidden")
+            model_textbox.blur(fn=preload_model_handler, inputs=[model_textbox], show_progress="hidden")
+
+        pause_btn.click(fn=toggle_pause_handler, outputs=[pause_btn])
+        stop_btn.click(fn=stop_handler, outputs=[pause_btn])
+        app.unload(cancel_on_disconnect)
+
+        calibrate_btn.click(
+            fn=calibrate_models_handler,
+            inputs=[
+                epub_upload_btn,
+                calibration_models_input,
+                calibration_concurrency_input,
+                lang_from_dropdown,
+                lang_to_dropdown
+            ],
+            outputs=[calibration_report_display, model_name_input, concurrency_slider],
+        )
+
+    return app
+
+def __getattr__(name: str):
+    # Mantém `from main import app` (e o modo de recarga do Gradio) funcionando sem montar a UI no import.
+    # A UI é montada uma única vez: depois do primeiro acesso `app` é um global comum e este hook não é mais chamado.
+    if name == "app":
+        globals()["app"] = build_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
-    app.queue()
-    app.launch(debug=True)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="EPUB translator with Ollama.")
+    parser.add_argument("--calibrate", metavar="EPUB", help="Benchmark candidate models/concurrency levels on a sample of this book instead of starting the UI.")
+    parser.add_argument("--models", default=",".join(SUGGESTED_MODELS), help="Comma-separated candidate models for --calibrate.")
+    parser.add_argument("--concurrency", default=",".join(str(level) for level in CALIBRATION_CONCURRENCY_LEVELS), help="Comma-separated concurrency levels for --calibrate.")
+    parser.add_argument("--from-lang", default="auto", help="Source language for --calibrate (default: auto-detect).")
+    parser.add_argument("--to-lang", default="PT-BR", help="Target language for --calibrate.")
+    args = parser.parse_args()
+
+    if args.calibrate:
+        calibration_results, best_configuration = calibrate_for_book(
+            args.calibrate,
+            _parse_csv_list(args.models),
+            [min(MAX_CONCURRENCY, max(1, int(level))) for level in _parse_csv_list(args.concurrency)],
+            args.from_lang,
+            args.to_lang
+        )
+        print(format_calibration_report(calibration_results, best_configuration))
+    else:
+        app = build_app()
+        app.queue()
+        app.launch(debug=True)
\ No newline at end of file
@@ -11,7 +11,7 @@ translations = {
         "model_name_label": "Ollama Model Name",
         "model_name_placeholder": "e.g., llama3, mistral",
         "from_language_label": "From Language",
-        "to_language_label": "To Language",
+        "to_language_label": "To Language(s)",
 
         "chapters_accordion_label": "Choose chapters to translate (default = all)",
         "section_3_title": "### 3. Select Chapters for Translation",
@@ -27,6 +27,24 @@ translations = {
         "section_4_title": "### 4. Translate & Download",
         "translate_button_text": "🌍 Translate Selected Chapters",
         "download_label": "Download Translated EPUB",
+        "preview_accordion_label": "Preview (translate a sample first)",
+        "preview_mode_label": "Preview set",
+        "preview_mode_none": "No preview",
+        "preview_mode_first_chapter": "First selected chapter",
+        "preview_mode_sample": "First blocks of each chapter",
+        "preview_continue_label": "Continue the full translation after the preview",
+        "cascade_accordion_label": "Model Cascade",
+        "cascade_model_label": "Fast model for a first pass (blocks that fail the checks go to the main model)",
+        "cascade_model_placeholder": "e.g. phi4 (leave empty to disable)",
+        "concurrency_label": "Concurrent requests",
+        "calibration_accordion_label": "Calibrate models on this book",
+        "calibration_models_label": "Candidate models (comma-separated)",
+        "calibration_concurrency_label": "Concurrency levels to test (comma-separated)",
+        "calibration_button_text": "Run Calibration",
+        "pause_button_text": "⏸️ Pause",
+        "resume_button_text": "▶️ Resume",
+        "stop_button_text": "⏹️ Stop",
+        "estimate_label": "Estimated Job Size and Duration",
         
         # --- Dynamic & Status Messages ---
         "chapters_selector_label_count": "Chapters to Translate ({num_chapters} found)",
@@ -67,7 +85,7 @@ translations = {
     "model_name_label": "Nome do Modelo Ollama",
     "model_name_placeholder": "ex.: llama3, mistral",
     "from_language_label": "Idioma de Origem",
-    "to_language_label": "Idioma de Destino",
+    "to_language_label": "Idioma(s) de Destino",
 
     "chapters_accordion_label": "Escolha os capítulos a serem traduzidos (padrão = todos)",
     "section_3_title": "### 3. Selecione Capítulos para Tradução",
@@ -83,6 +101,24 @@ translations = {
     "section_4_title": "### 4. Traduzir & Baixar",
     "translate_button_text": "🌍 Traduzir Capítulos Selecionados",
     "download_label": "Baixar EPUB Traduzido",
+    "preview_accordion_label": "Pré-visualização (traduzir uma amostra primeiro)",
+    "preview_mode_label": "Conjunto de pré-visualização",
+    "preview_mode_none": "Sem pré-visualização",
+    "preview_mode_first_chapter": "Primeiro capítulo selecionado",
+    "preview_mode_sample": "Primeiros blocos de cada capítulo",
+    "preview_continue_label": "Continuar a tradução completa após a pré-visualização",
+    "cascade_accordion_label": "Cascata de Modelos",
+    "cascade_model_label": "Modelo rápido para a primeira passada (blocos reprovados nas checagens vão para o modelo principal)",
+    "cascade_model_placeholder": "ex.: phi4 (deixe vazio para desativar)",
+    "concurrency_label": "Requisições simultâneas",
+    "calibration_accordion_label": "Calibrar modelos com este livro",
+    "calibration_models_label": "Modelos candidatos (separados por vírgula)",
+    "calibration_concurrency_label": "Níveis de concorrência a testar (separados por vírgula)",
+    "calibration_button_text": "Executar Calibração",
+    "pause_button_text": "⏸️ Pausar",
+    "resume_button_text": "▶️ Retomar",
+    "stop_button_text": "⏹️ Parar",
+    "estimate_label": "Estimativa de Tamanho e Duração",
     
     # --- Dynamic & Status Messages ---
     "chapters_selector_label_count": "Capítulos a Serem Traduzidos ({num_chapters} encontrados)",
@@ -133,6 +169,24 @@ translations = {
         "section_4_title": "### 4. 翻译并下载",
         "translate_button_text": "🌍 翻译所选章节",
         "download_label": "下载翻译后的 EPUB",
+        "preview_accordion_label": "预览（先翻译样本）",
+        "preview_mode_label": "预览范围",
+        "preview_mode_none": "不预览",
+        "preview_mode_first_chapter": "第一个所选章节",
+        "preview_mode_sample": "每章的前几个段落",
+        "preview_continue_label": "预览完成后继续完整翻译",
+        "cascade_accordion_label": "模型级联",
+        "cascade_model_label": "首轮使用的快速模型（未通过检查的段落将交给主模型）",
+        "cascade_model_placeholder": "例如 phi4（留空则禁用）",
+        "concurrency_label": "并发请求数",
+        "calibration_accordion_label": "用本书校准模型",
+        "calibration_models_label": "候选模型（逗号分隔）",
+        "calibration_concurrency_label": "要测试的并发级别（逗号分隔）",
+        "calibration_button_text": "运行校准",
+        "pause_button_text": "⏸️ 暂停",
+        "resume_button_text": "▶️ 继续",
+        "stop_button_text": "⏹️ 停止",
+        "estimate_label": "预计任务规模与时长",
         "chapters_selector_label_count": "要翻译的章节（共找到 {num_chapters} 个）",
         "epub_structure_info_value": "EPUB 中找到 {num_chapters} 个章节文档。",
         "progress_starting": "开始翻译...",
@@ -165,7 +219,7 @@ translations = {
         "model_name_label": "Nombre del Modelo Ollama",
         "model_name_placeholder": "p. ej., llama3, mistral",
         "from_language_label": "Idioma de Origen",
-        "to_language_label": "Idioma de Destino",
+        "to_language_label": "Idioma(s) de Destino",
         "chapters_accordion_label": "Elegir capítulos para traducir (por defecto = todos)",
         "section_3_title": "### 3. Selecciona Capítulos a Traducir",
         "deselect_all_btn": "Deseleccionar Todos",
@@ -178,6 +232,24 @@ translations = {
         "section_4_title": "### 4. Traducir y Descargar",
         "translate_button_text": "🌍 Traducir Capítulos Seleccionados",
         "download_label": "Descargar EPUB Traducido",
+        "preview_accordion_label": "Vista previa (traducir una muestra primero)",
+        "preview_mode_label": "Conjunto de vista previa",
+        "preview_mode_none": "Sin vista previa",
+        "preview_mode_first_chapter": "Primer capítulo seleccionado",
+        "preview_mode_sample": "Primeros bloques de cada capítulo",
+        "preview_continue_label": "Continuar la traducción completa tras la vista previa",
+        "cascade_accordion_label": "Cascada de Modelos",
+        "cascade_model_label": "Modelo rápido para una primera pasada (los bloques que fallen las comprobaciones van al modelo principal)",
+        "cascade_model_placeholder": "p. ej. phi4 (déjelo vacío para desactivar)",
+        "concurrency_label": "Solicitudes simultáneas",
+        "calibration_accordion_label": "Calibrar modelos con este libro",
+        "calibration_models_label": "Modelos candidatos (separados por comas)",
+        "calibration_concurrency_label": "Niveles de concurrencia a probar (separados por comas)",
+        "calibration_button_text": "Ejecutar Calibración",
+        "pause_button_text": "⏸️ Pausar",
+        "resume_button_text": "▶️ Reanudar",
+        "stop_button_text": "⏹️ Detener",
+        "estimate_label": "Estimación de Tamaño y Duración",
         "chapters_selector_label_count": "Capítulos para traducir ({num_chapters} encontrados)",
         "epub_structure_info_value": "{num_chapters} documentos de capítulo encontrados en el EPUB.",
         "progress_starting": "Iniciando traducción...",
@@ -210,7 +282,7 @@ translations = {
         "model_name_label": "Nom du Modèle Ollama",
         "model_name_placeholder": "ex. : llama3, mistral",
         "from_language_label": "Langue Source",
-        "to_language_label": "Langue Cible",
+        "to_language_label": "Langue(s) Cible(s)",
         "chapters_accordion_label": "Choisir les chapitres à traduire (par défaut = tous)",
         "section_3_title": "### 3. Sélectionner les Chapitres",
         "deselect_all_btn": "Tout désélectionner",
@@ -223,6 +295,24 @@ translations = {
         "section_4_title": "### 4. Traduire & Télécharger",
         "translate_button_text": "🌍 Traduire les Chapitres Sélectionnés",
         "download_label": "Télécharger l'EPUB traduit",
+        "preview_accordion_label": "Aperçu (traduire un échantillon d'abord)",
+        "preview_mode_label": "Ensemble d'aperçu",
+        "preview_mode_none": "Pas d'aperçu",
+        "preview_mode_first_chapter": "Premier chapitre sélectionné",
+        "preview_mode_sample": "Premiers blocs de chaque chapitre",
+        "preview_continue_label": "Poursuivre la traduction complète après l'aperçu",
+        "cascade_accordion_label": "Cascade de Modèles",
+        "cascade_model_label": "Modèle rapide pour un premier passage (les blocs qui échouent aux vérifications passent au modèle principal)",
+        "cascade_model_placeholder": "ex. phi4 (laisser vide pour désactiver)",
+        "concurrency_label": "Requêtes simultanées",
+        "calibration_accordion_label": "Calibrer les modèles sur ce livre",
+        "calibration_models_label": "Modèles candidats (séparés par des virgules)",
+        "calibration_concurrency_label": "Niveaux de concurrence à tester (séparés par des virgules)",
+        "calibration_button_text": "Lancer la Calibration",
+        "pause_button_text": "⏸️ Pause",
+        "resume_button_text": "▶️ Reprendre",
+        "stop_button_text": "⏹️ Arrêter",
+        "estimate_label": "Estimation de la Taille et de la Durée",
         "chapters_selector_label_count": "Chapitres à traduire ({num_chapters} trouvés)",
         "epub_structure_info_value": "{num_chapters} chapitres trouvés dans l’EPUB.",
         "progress_starting": "Démarrage de la traduction...",
@@ -268,6 +358,24 @@ translations = {
         "section_4_title": "### 4. 翻訳とダウンロード",
         "translate_button_text": "🌍 選択した章を翻訳する",
         "download_label": "翻訳済 EPUB をダウンロード",
+        "preview_accordion_label": "プレビュー（先にサンプルを翻訳）",
+        "preview_mode_label": "プレビュー範囲",
+        "preview_mode_none": "プレビューなし",
+        "preview_mode_first_chapter": "選択した最初の章",
+        "preview_mode_sample": "各章の最初のブロック",
+        "preview_continue_label": "プレビュー後に全体の翻訳を続ける",
+        "cascade_accordion_label": "モデルカスケード",
+        "cascade_model_label": "最初に使う高速モデル（チェックに失敗したブロックはメインモデルへ）",
+        "cascade_model_placeholder": "例: phi4（空欄で無効）",
+        "concurrency_label": "同時リクエスト数",
+        "calibration_accordion_label": "この本でモデルを調整する",
+        "calibration_models_label": "候補モデル（カンマ区切り）",
+        "calibration_concurrency_label": "テストする同時実行数（カンマ区切り）",
+        "calibration_button_text": "キャリブレーションを実行",
+        "pause_button_text": "⏸️ 一時停止",
+        "resume_button_text": "▶️ 再開",
+        "stop_button_text": "⏹️ 停止",
+        "estimate_label": "推定ジョブ規模と所要時間",
         "chapters_selector_label_count": "翻訳対象の章（{num_chapters} 件）",
         "epub_structure_info_value": "EPUB に {num_chapters} 件の章ドキュメントがあります。",
         "progress_starting": "翻訳を開始中...",
@@ -300,7 +408,7 @@ translations = {
         "model_name_label": "Имя модели Ollama",
         "model_name_placeholder": "например: llama3, mistral",
         "from_language_label": "Исходный язык",
-        "to_language_label": "Целевой язык",
+        "to_language_label": "Целевые языки",
         "chapters_accordion_label": "Выберите главы для перевода (по умолчанию = все)",
         "section_3_title": "### 3. Выбор глав для перевода",
         "deselect_all_btn": "Снять выбор со всех глав",
@@ -313,6 +421,24 @@ translations = {
         "section_4_title": "### 4. Перевести и скачать",
         "translate_button_text": "🌍 Перевести выбранные главы",
         "download_label": "Скачать переведённый EPUB",
+        "preview_accordion_label": "Предпросмотр (сначала перевести образец)",
+        "preview_mode_label": "Набор для предпросмотра",
+        "preview_mode_none": "Без предпросмотра",
+        "preview_mode_first_chapter": "Первая выбранная глава",
+        "preview_mode_sample": "Первые блоки каждой главы",
+        "preview_continue_label": "Продолжить полный перевод после предпросмотра",
+        "cascade_accordion_label": "Каскад моделей",
+        "cascade_model_label": "Быстрая модель для первого прохода (блоки, не прошедшие проверки, уходят основной модели)",
+        "cascade_model_placeholder": "например, phi4 (оставьте пустым, чтобы отключить)",
+        "concurrency_label": "Одновременные запросы",
+        "calibration_accordion_label": "Калибровка моделей на этой книге",
+        "calibration_models_label": "Модели-кандидаты (через запятую)",
+        "calibration_concurrency_label": "Уровни параллелизма для проверки (через запятую)",
+        "calibration_button_text": "Запустить калибровку",
+        "pause_button_text": "⏸️ Пауза",
+        "resume_button_text": "▶️ Продолжить",
+        "stop_button_text": "⏹️ Остановить",
+        "estimate_label": "Оценка объёма и длительности",
         "chapters_selector_label_count": "Главы для перевода ({num_chapters} найдено)",
         "epub_structure_info_value": "{num_chapters} глав найдено в EPUB.",
         "progress_starting": "Начинаем перевод...",